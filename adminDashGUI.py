@@ -11,20 +11,15 @@ from kivy.clock import Clock
 from kivy.core.window import Window
 from kivy.uix.popup import Popup
 
-from datetime import datetime # Added
-import xml.etree.ElementTree as ET # Added
-import os # Added
-
 import auth
+import dashboard_data
+import events
 from models import User, Admin
 from adminInventory import AdminInventoryScreen
 from adminNav import NavBar
-from tickets import get_routes
 
-import matplotlib
-matplotlib.use('Agg')  # Use non-GUI backend for Kivy
-import matplotlib.pyplot as plt
 import io
+import threading
 from kivy.core.image import Image as CoreImage
 from kivy.uix.image import Image as KivyImage
 
@@ -127,45 +122,6 @@ class HomeScreen(Screen):
         self.manager.current = "login"
 
 
-# Helper function to get transaction summary for the current day
-def get_daily_transaction_summary():
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    transactions_dir = "transactions"
-    if not os.path.exists(transactions_dir):
-        os.makedirs(transactions_dir)
-    filename = os.path.join(transactions_dir, f"transactions_{today_str}.xml")
-    total_sales = 0.0
-    transaction_count = 0
-    error_message = None
-
-    if not os.path.exists(filename):
-        error_message = f"File not found: {filename}"
-        print(f"[AdminDashboard] {error_message}")
-        return {'sales': total_sales, 'count': transaction_count, 'error': error_message}
-
-    try:
-        tree = ET.parse(filename)
-        daily_root = tree.getroot()
-
-        if daily_root.tag != "DailyTransactions":
-            error_message = f"Invalid XML format in {filename}"
-            print(f"[AdminDashboard] {error_message}")
-            return {'sales': total_sales, 'count': transaction_count, 'error': error_message}
-
-        for trans_elem in daily_root.findall("Transaction"):
-            try:
-                total_text = trans_elem.find("Summary/Total")
-                if total_text is not None and total_text.text:
-                    total_sales += float(total_text.text)
-                transaction_count += 1
-            except (ValueError, AttributeError) as e_item:
-                print(f"[AdminDashboard] Warning: Skipping a transaction in {filename} due to item parsing error: {e_item}")
-    except ET.ParseError as e_parse:
-        error_message = f"Error parsing XML file {filename}: {e_parse}"
-        print(f"[AdminDashboard] {error_message}")
-    return {'sales': total_sales, 'count': transaction_count, 'error': error_message}
-
-
 class MetricCard(BoxLayout):
     """
     Card widget for displaying a metric with title and value
@@ -285,6 +241,8 @@ class AdminDashboard(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.name = "admin_dashboard"
+        self._shown_data = None  # Dashboard data the widgets currently reflect
+        self._chart_key = None  # (date, hourly counts) of the chart shown or being rendered
         
         # Main layout: vertical, NavBar at top, content below
         main_layout = BoxLayout(orientation='vertical', spacing=0, padding=0)
@@ -327,27 +285,14 @@ class AdminDashboard(Screen):
             height=dp(120)
         )
         
-        # Fetch initial dynamic data
-        summary_data = get_daily_transaction_summary()
-        sales_val = summary_data.get('sales', 0.0)
-        count_val = summary_data.get('count', 0)
-        error_msg = summary_data.get('error')
-
-        # Determine display values
-        if error_msg and "File not found" not in error_msg: # An error occurred, and it's not 'File not found'
-            initial_sales_value = "Error"
-            initial_transactions_value = "Error"
-        else: # No error, or 'File not found' (in which case sales_val and count_val are 0)
-            initial_sales_value = f"₱{sales_val:,.2f}"
-            initial_transactions_value = str(count_val)
-            
-        # Low and critical stock counts
-        low_stock_count, critical_stock_count = count_low_and_critical_stock()
+        # Placeholders until the first load finishes on a worker thread (on_enter)
+        data = dashboard_data.placeholder_data()
+        initial_sales_value, initial_transactions_value = self._format_sales_metrics(data)
 
         # Create and store metric cards as instance variables
         self.sales_metric = MetricCard("Today's Sales", initial_sales_value)
         self.transactions_metric = MetricCard("Transactions Today", initial_transactions_value)
-        self.low_stock_metric = MetricCard("Low Stock Items", str(low_stock_count))
+        self.low_stock_metric = MetricCard("Low Stock Items", "...")
         self.active_users_metric = MetricCard("Active Users", "1") # Static for now
         
         metrics_grid.add_widget(self.sales_metric)
@@ -370,22 +315,7 @@ class AdminDashboard(Screen):
         self.alerts_container = BoxLayout(orientation='vertical', spacing=dp(10), size_hint=(1, None)) # Made instance variable
         self.alerts_container.bind(minimum_height=self.alerts_container.setter('height'))
         
-        # Sample alerts
-        alerts = []
-        if critical_stock_count > 0:
-            alerts.append({
-                "message": f"Critical Stock: {critical_stock_count} item(s) at or below 5 remaining!",
-                "level": "critical"
-            })
-        if low_stock_count > 0:
-            alerts.append({
-                "message": f"Low Stock: {low_stock_count} item(s) at or below 10 remaining.",
-                "level": "warning"
-            })
-        
-        for alert in alerts:
-            alert_item = AlertItem(alert["message"], alert["level"])
-            self.alerts_container.add_widget(alert_item)
+        self._shown_alerts = None  # (low, critical) counts the alert list shows
         
         # Create scrollview for alerts
         alerts_scroll = ScrollView(size_hint=(1, None), height=dp(200))
@@ -410,7 +340,6 @@ class AdminDashboard(Screen):
         self.chart_box.bind(pos=self._update_chart_bg, size=self._update_chart_bg)
         self.chart_img = KivyImage(allow_stretch=True, keep_ratio=True, size_hint=(1, 1))
         self.chart_box.add_widget(self.chart_img)
-        self.update_sales_trend_graph()  # Draw initial graph
         
         # Add all sections to content_container
         content_container.add_widget(header)
@@ -433,22 +362,25 @@ class AdminDashboard(Screen):
             self.rect = Rectangle(size=self.size, pos=self.pos)
         self.bind(size=self._update_rect, pos=self._update_rect)
         Clock.schedule_once(self._update_rect, 0)
+
+        # Live updates: checkouts and inventory edits are applied as they
+        # happen, with a periodic full reconcile as a safety net
+        self._reset_live(data)
+        self._chart_trigger = Clock.create_trigger(lambda dt: self.update_sales_trend_graph(self._live), CHART_REFRESH_DELAY)
+        events.subscribe(events.SALE_COMPLETED, lambda record: Clock.schedule_once(lambda dt: self._on_sale_completed(record)))
+        events.subscribe(events.STOCK_CHANGED, lambda ticket_id, ticket: Clock.schedule_once(lambda dt: self._on_stock_changed(ticket_id, ticket)))
+        Clock.schedule_interval(self._reconcile, RECONCILE_INTERVAL)
     
     def on_enter(self):
         """Called when the screen is entered."""
-        # Fetch fresh data for dynamic metric cards
-        summary_data = get_daily_transaction_summary()
-        sales_val = summary_data.get('sales', 0.0)
-        count_val = summary_data.get('count', 0)
-        error_msg = summary_data.get('error')
+        # One memoized read for every figure, loaded off the UI thread; the
+        # widgets keep showing the last data until it arrives
+        self._reconcile()
 
-        # Determine display values
-        if error_msg and "File not found" not in error_msg: # An error occurred, and it's not 'File not found'
-            display_sales_value = "Error"
-            display_transactions_value = "Error"
-        else: # No error, or 'File not found' (in which case sales_val and count_val are 0)
-            display_sales_value = f"₱{sales_val:,.2f}"
-            display_transactions_value = str(count_val)
+    def _apply_data(self, data):
+        """Show a full set of dashboard data and restart live updates from it."""
+        self._reset_live(data)
+        display_sales_value, display_transactions_value = self._format_sales_metrics(data)
 
         # Update the text of the value labels in the metric cards
         if hasattr(self, 'sales_metric') and self.sales_metric:
@@ -457,34 +389,124 @@ class AdminDashboard(Screen):
         if hasattr(self, 'transactions_metric') and self.transactions_metric:
             self.transactions_metric.value_label.text = display_transactions_value
 
-        if error_msg:
-            print(f"[AdminDashboard] on_enter: Summary status: {error_msg}")
+        if data['error']:
+            print(f"[AdminDashboard] on_enter: Summary status: {data['error']}")
 
         # Update low and critical stock counts and alerts
-        low_stock_count, critical_stock_count = count_low_and_critical_stock()
+        low_stock_count = data['low_stock']
+        critical_stock_count = data['critical_stock']
 
         if hasattr(self, 'low_stock_metric') and self.low_stock_metric:
             self.low_stock_metric.value_label.text = str(low_stock_count)
 
         # Update alerts
-        if hasattr(self, 'alerts_container') and self.alerts_container:
-            self.alerts_container.clear_widgets()
-            updated_alerts = []
-            if critical_stock_count > 0:
-                updated_alerts.append({
-                    "message": f"Critical Stock: {critical_stock_count} item(s) at or below 5 remaining!",
-                    "level": "critical"
-                })
-            if low_stock_count > 0: # This will include critical stock items as well if low_stock_count is just items <=10
-                updated_alerts.append({
-                    "message": f"Low Stock: {low_stock_count} item(s) at or below 10 remaining.", # Consider if this message should exclude critical items
-                    "level": "warning"
-                })
-            for alert_data in updated_alerts:
-                self.alerts_container.add_widget(AlertItem(alert_data["message"], alert_data["level"]))
-
-        # Refresh the sales trend graph every time the screen is loaded
-        self.update_sales_trend_graph()
+        self._show_alerts(low_stock_count, critical_stock_count)
+
+        # Redraw the sales trend graph with the new data
+        self.update_sales_trend_graph(data)
+
+    def _show_alerts(self, low_stock_count, critical_stock_count):
+        if (low_stock_count, critical_stock_count) == self._shown_alerts:
+            return  # Nothing to redraw
+        self._shown_alerts = (low_stock_count, critical_stock_count)
+        self.alerts_container.clear_widgets()
+        alerts = []
+        if critical_stock_count > 0:
+            alerts.append({
+                "message": f"Critical Stock: {critical_stock_count} item(s) at or below 5 remaining!",
+                "level": "critical"
+            })
+        if low_stock_count > 0: # This will include critical stock items as well if low_stock_count is just items <=10
+            alerts.append({
+                "message": f"Low Stock: {low_stock_count} item(s) at or below 10 remaining.", # Consider if this message should exclude critical items
+                "level": "warning"
+            })
+        for alert in alerts:
+            self.alerts_container.add_widget(AlertItem(alert["message"], alert["level"]))
+
+    def _reset_live(self, data):
+        # Working copy of the figures that checkout and stock events patch
+        self._live = dict(data)
+        self._live['hourly_counts'] = list(data['hourly_counts'])
+        self._live['stock_levels'] = dict(data['stock_levels'])
+
+    def _show_live_metrics(self):
+        live = self._live
+        sales_value, transactions_value = self._format_sales_metrics(live)
+        self.sales_metric.value_label.text = sales_value
+        self.transactions_metric.value_label.text = transactions_value
+        self.low_stock_metric.value_label.text = str(live['low_stock'])
+        self._show_alerts(live['low_stock'], live['critical_stock'])
+
+    def _set_stock_level(self, ticket_id, availability):
+        """Update one ticket's stock and the low/critical counts in O(1)."""
+        live = self._live
+        old = live['stock_levels'].pop(ticket_id, None)
+        if old is not None:
+            live['low_stock'] -= old <= dashboard_data.LOW_STOCK_THRESHOLD
+            live['critical_stock'] -= old <= dashboard_data.CRITICAL_STOCK_THRESHOLD
+        if availability is not None:
+            availability = max(availability, 0)
+            live['stock_levels'][ticket_id] = availability
+            live['low_stock'] += availability <= dashboard_data.LOW_STOCK_THRESHOLD
+            live['critical_stock'] += availability <= dashboard_data.CRITICAL_STOCK_THRESHOLD
+
+    def _on_sale_completed(self, record):
+        live = self._live
+        if live['loading']:
+            return  # The first load is still running and will include it
+        if live['error'] and "File not found" not in live['error']:
+            return  # Showing an error; leave it to the next reconcile
+        sale_date, _, sale_time = record['timestamp'].partition(' ')
+        if sale_date != live['date']:
+            self._reconcile()  # The day rolled over
+            return
+        if live['trend_date'] != sale_date:
+            # First sale today: the trend switches over from the previous day
+            live['trend_date'] = sale_date
+            live['hourly_counts'] = [0] * 24
+            live['error'] = None
+        live['sales'] += float(record['total'])
+        live['count'] += 1
+        try:
+            live['hourly_counts'][int(sale_time.split(':')[0])] += 1
+        except (ValueError, IndexError):
+            pass
+        for item in record['items']:
+            ticket_id = item.get('ticket_id')
+            if ticket_id in live['stock_levels']:
+                self._set_stock_level(ticket_id, live['stock_levels'][ticket_id] - int(item['quantity']))
+        self._show_live_metrics()
+        self._chart_trigger()
+
+    def _on_stock_changed(self, ticket_id, ticket):
+        if self._live['loading']:
+            return
+        self._set_stock_level(ticket_id, int(ticket['availability']) if ticket else None)
+        self._show_live_metrics()
+
+    def _reconcile(self, dt=None):
+        """Recompute everything from the source files and catalog in the background."""
+        if not self.manager or self.manager.current != self.name:
+            return  # Not visible; on_enter refreshes when it is shown again
+        def fetch():
+            try:
+                data = dashboard_data.get_dashboard_data()
+            except Exception as e:
+                print(f"[AdminDashboard] Reconcile failed: {e}")
+                return
+            Clock.schedule_once(lambda dt: self._apply_data(data) if data is not self._shown_data else None)
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def _format_sales_metrics(self, data):
+        """Return the (sales, transactions) metric texts for dashboard data."""
+        if data['loading']:
+            return "...", "..."
+        error_msg = data['error']
+        if error_msg and "File not found" not in error_msg: # An error occurred, and it's not 'File not found'
+            return "Error", "Error"
+        # No error, or 'File not found' (in which case sales and count are 0)
+        return f"₱{data['sales']:,.2f}", str(data['count'])
 
     def _update_rect(self, *args):
         self.rect.size = self.size
@@ -501,75 +523,80 @@ class AdminDashboard(Screen):
         auth.logout()
         self.manager.current = "login"
 
-    def update_sales_trend_graph(self):
-        # Get today's transactions (from XML), or most recent if today's is missing
-        from datetime import datetime
-        import xml.etree.ElementTree as ET
-        import os
-        transactions_dir = "transactions"
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        filename = os.path.join(transactions_dir, f"transactions_{today_str}.xml")
-        # If today's file does not exist, use the most recent XML file
-        most_recent_date = today_str
-        if not os.path.exists(filename):
-            xml_files = [f for f in os.listdir(transactions_dir) if f.startswith('transactions_') and f.endswith('.xml')]
-            if xml_files:
-                xml_files.sort(reverse=True)
-                filename = os.path.join(transactions_dir, xml_files[0])
-                # Extract date from filename (transactions_YYYY-MM-DD.xml)
-                most_recent_date = xml_files[0].replace('transactions_', '').replace('.xml', '')
-        sales_by_hour = {h: 0 for h in range(24)}
-        if os.path.exists(filename):
-            try:
-                tree = ET.parse(filename)
-                daily_root = tree.getroot()
-                for trans_elem in daily_root.findall("Transaction"):
-                    timestamp = trans_elem.findtext("Timestamp", "")
-                    if timestamp:
-                        try:
-                            hour = int(timestamp.split()[1].split(":")[0])
-                            sales_by_hour[hour] += 1
-                        except Exception:
-                            continue
-            except Exception:
-                pass
-        hours = list(sales_by_hour.keys())
-        counts = [sales_by_hour[h] for h in hours]
-        # Plot with matplotlib
-        plt.figure(figsize=(12, 3.5), facecolor='none')
-        ax = plt.gca()
-        ax.set_facecolor('none')  # Transparent axes background
-        plt.plot(hours, counts, marker='o', color='#3944BC', linewidth=2)
-        plt.title(f'Transactions per Hour ({most_recent_date})', fontsize=12)
-        plt.xlabel('Hour of Day')
-        plt.ylabel('Transactions')
-        plt.xticks(range(0, 24, 1))
-        plt.grid(True, linestyle='--', alpha=0.2)
-        # Remove all spines (borders)
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        # Remove axes frame
-        ax.set_frame_on(False)
-        plt.tight_layout()
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', transparent=True, bbox_inches='tight', pad_inches=0.1)
-        plt.close()
-        buf.seek(0)
+    def update_sales_trend_graph(self, data):
+        # Hourly counts for today, or the most recent day's if today has none
+        self._shown_data = data
+        key = (data['trend_date'], tuple(data['hourly_counts']))
+        if key == self._chart_key:
+            return  # Already showing (or rendering) this exact chart
+        self._chart_key = key
+
+        png = _chart_cache.get(key)
+        if png is not None:
+            self._show_chart(key, png)
+            return
+        # Render off the UI thread; only the texture is created back on it
+        threading.Thread(target=self._render_chart, args=(key,), daemon=True).start()
+
+    def _render_chart(self, key):
+        try:
+            png = render_sales_trend_png(*key)
+        except Exception as e:
+            print(f"[AdminDashboard] Error rendering sales trend chart: {e}")
+            return
+        with _chart_cache_lock:
+            _chart_cache[key] = png
+            while len(_chart_cache) > CHART_CACHE_SIZE:
+                _chart_cache.pop(next(iter(_chart_cache)))
+        Clock.schedule_once(lambda dt: self._show_chart(key, png))
+
+    def _show_chart(self, key, png):
+        if key != self._chart_key:
+            return  # A newer chart was requested meanwhile
+        buf = io.BytesIO(png)
         im = CoreImage(buf, ext='png')
         buf.close()
         self.chart_img.texture = im.texture
 
 
-def count_low_and_critical_stock():
-    low_stock = 0
-    critical_stock = 0
-    for item in get_routes():
-        try:
-            avail = int(item.get('availability', 0))
-            if avail <= 10:
-                low_stock += 1
-            if avail <= 5:
-                critical_stock += 1
-        except Exception:
-            continue
-    return low_stock, critical_stock
\ No newline at end of file
+# How often a visible dashboard re-derives its figures from scratch, and how
+# long checkout events are coalesced before the trend chart is redrawn
+RECONCILE_INTERVAL = 60  # seconds
+CHART_REFRESH_DELAY = 2  # seconds
+
+# Rendered chart PNGs keyed by (date, hourly counts); small, oldest dropped first
+CHART_CACHE_SIZE = 8
+_chart_cache = {}
+_chart_cache_lock = threading.Lock()
+
+
+def render_sales_trend_png(trend_date, counts):
+    """Render the transactions-per-hour chart to PNG bytes.
+
+    Uses a standalone Figure rather than pyplot, so it is safe to call from
+    a worker thread. matplotlib is imported here, on the first render, so
+    loading the dashboard module stays cheap.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-GUI backend for Kivy
+    from matplotlib.figure import Figure
+
+    hours = list(range(24))
+    fig = Figure(figsize=(12, 3.5), facecolor='none')
+    ax = fig.add_subplot()
+    ax.set_facecolor('none')  # Transparent axes background
+    ax.plot(hours, counts, marker='o', color='#3944BC', linewidth=2)
+    ax.set_title(f'Transactions per Hour ({trend_date})', fontsize=12)
+    ax.set_xlabel('Hour of Day')
+    ax.set_ylabel('Transactions')
+    ax.set_xticks(range(0, 24, 1))
+    ax.grid(True, linestyle='--', alpha=0.2)
+    # Remove all spines (borders)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    # Remove axes frame
+    ax.set_frame_on(False)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', transparent=True, bbox_inches='tight', pad_inches=0.1)
+    return buf.getvalue()
@@ -8,8 +8,9 @@ from kivy.uix.popup import Popup
 from kivy.uix.scrollview import ScrollView
 from kivy.metrics import dp
 from kivy.graphics import Color, Rectangle, RoundedRectangle, Line
-from tickets import get_routes, add_route, remove_route, update_route, get_next_ticket_id
+from tickets import get_routes, get_ticket, add_route, update_ticket, delete_ticket, adjust_stock, get_next_ticket_id
 from adminNav import NavBar
+import events
 from kivy.uix.widget import Widget
 from kivy.uix.image import Image
 from kivy.uix.behaviors import ButtonBehavior
@@ -399,12 +400,7 @@ class AdminInventoryScreen(Screen):
         self.table.refresh_data(routes, query)
 
     def open_edit_popup(self, ticket_id_to_edit):
-        current_routes = get_routes()
-        ticket_to_edit_data = None
-        for t_obj in current_routes:
-            if t_obj['ticket_id'] == ticket_id_to_edit:
-                ticket_to_edit_data = t_obj
-                break
+        ticket_to_edit_data = get_ticket(ticket_id_to_edit)
         
         if ticket_to_edit_data is None:
             print(f"Error: Ticket with ID {ticket_id_to_edit} not found for editing.")
@@ -412,60 +408,31 @@ class AdminInventoryScreen(Screen):
             return
 
         def save_callback(data):
-            # Re-find index before updating, as list might have changed
-            idx_for_update = -1
-            fresh_routes_before_update = get_routes()
-            for i, t_upd in enumerate(fresh_routes_before_update):
-                if t_upd['ticket_id'] == ticket_id_to_edit: # Use original ticket_id_to_edit
-                    idx_for_update = i
-                    break
-            
-            if idx_for_update != -1:
-                # data['ticket_id'] should match ticket_id_to_edit as it's readonly
-                update_route(idx_for_update, data)
-            else:
+            # data['ticket_id'] matches ticket_id_to_edit as the field is readonly
+            saved = update_ticket(ticket_id_to_edit, data)
+            if saved is None:
                 print(f"Error: Ticket with ID {ticket_id_to_edit} disappeared before saving edit.")
+            events.publish(events.STOCK_CHANGED, ticket_id=ticket_id_to_edit, ticket=saved)
             self.refresh_table()
             
         TicketEditPopup(ticket=ticket_to_edit_data.copy(), on_save=save_callback).open() # Pass a copy
     
     def open_add_popup(self, instance):
         def save_callback(data):
-            add_route(data)
+            saved = add_route(data)
+            events.publish(events.STOCK_CHANGED, ticket_id=data['ticket_id'], ticket=saved)
             self.refresh_table()
         TicketEditPopup(ticket=None, on_save=save_callback).open()
     
     def delete_ticket(self, ticket_id_to_delete):
-        current_routes = get_routes()
-        idx_to_delete = -1
-        for i, ticket_obj in enumerate(current_routes):
-            if ticket_obj['ticket_id'] == ticket_id_to_delete:
-                idx_to_delete = i
-                break
-        
-        if idx_to_delete != -1:
-            remove_route(idx_to_delete)
-            self.refresh_table()
-        else:
+        if not delete_ticket(ticket_id_to_delete):
             print(f"Warning: Ticket ID {ticket_id_to_delete} not found for deletion. Already deleted?")
-            self.refresh_table() # Refresh to sync UI
+        events.publish(events.STOCK_CHANGED, ticket_id=ticket_id_to_delete, ticket=None)
+        self.refresh_table()
     
     def increase_stock(self, ticket_id_to_modify):
-        current_routes = get_routes()
-        idx_to_modify = -1
-        ticket_data_to_modify = None
-        for i, ticket_obj in enumerate(current_routes):
-            if ticket_obj['ticket_id'] == ticket_id_to_modify:
-                idx_to_modify = i
-                ticket_data_to_modify = ticket_obj
-                break
-        
-        if ticket_data_to_modify is not None and idx_to_modify != -1:
-            # Create a new dictionary for the update to ensure `update_route` gets fresh data
-            updated_ticket_data = ticket_data_to_modify.copy()
-            updated_ticket_data['availability'] += 1
-            update_route(idx_to_modify, updated_ticket_data)
-            self.refresh_table()
-        else:
+        saved = adjust_stock(ticket_id_to_modify, 1)
+        if saved is None:
             print(f"Warning: Ticket ID {ticket_id_to_modify} not found for stock increase.")
-            self.refresh_table()
\ No newline at end of file
+        events.publish(events.STOCK_CHANGED, ticket_id=ticket_id_to_modify, ticket=saved)
+        self.refresh_table()
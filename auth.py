@@ -1,37 +1,90 @@
+import threading
 from models import User, Admin
-from db_config import execute_query
+from db_config import execute_query, execute_prepared
 
-# Global list to store users - shared with userManagement.py
-_users_list = []
+# Rows per page when listing users
+USERS_PAGE_SIZE = 50
 
 # Session dictionary to store current user info
 session = {
     "username": None,
-    "role": None
+    "role": None,
+    "user_id": None
 }
 
-def get_users():
-    """Returns the list of all users from the database."""
-    query = "SELECT * FROM users"
-    result = execute_query(query, fetch=True)
-    users = []
-    for user_data in result:
-        user = User(user_data['username'], '', user_data['role'])
-        user.password = user_data['password']  # Store the hashed password
-        users.append(user)
-    return users
+def get_users_page(offset=0, limit=USERS_PAGE_SIZE, search=None):
+    """Return (users, total) for one page of users, ordered by username.
 
-def authUser(users: list, username: str, password: str):
-    """Authenticate a user against the database."""
+    Only id, username and role are read; password hashes stay in the
+    database. search matches part of a username or role.
+    """
+    where = ""
+    params = ()
+    if search:
+        pattern = f"%{search}%"
+        where = " WHERE username LIKE %s OR role LIKE %s"
+        params = (pattern, pattern)
+    total = execute_query("SELECT COUNT(*) AS total FROM users" + where, params, fetch=True)[0]['total']
+    query = "SELECT id, username, role FROM users" + where + " ORDER BY username LIMIT %s OFFSET %s"
+    result = execute_query(query, params + (limit, offset), fetch=True)
+    return [User.from_row(user_data) for user_data in result], total
+
+def authenticate(username: str, password: str):
+    """Authenticate a user against the database and return the User, or None.
+
+    Blocks for the bcrypt check; the login screen uses authenticate_async.
+    A hash made with an outdated cost factor is replaced on success.
+    """
     user = User.get_by_username(username)
     if user and user.verify_password(password):
-        return user.role
+        if user.needs_rehash():
+            try:
+                user.set_password(password)
+                user.save_password()
+            except Exception as e:
+                print(f"[AUTH] Could not rehash password for {username}: {e}")
+        return user
     return None
 
-def setUserSession(username: str, role: str):
-    """Set the current user session."""
+def authenticate_async(username: str, password: str, callback):
+    """Run authenticate() on a worker thread.
+
+    callback(user, error) is called from that thread with the User (or None
+    for bad credentials), or with the exception if the lookup failed.
+    """
+    def run():
+        try:
+            user = authenticate(username, password)
+        except Exception as e:
+            callback(None, e)
+            return
+        callback(user, None)
+    threading.Thread(target=run, name="auth", daemon=True).start()
+
+def authUser(users: list, username: str, password: str):
+    """Authenticate a user against the database."""
+    user = authenticate(username, password)
+    return user.role if user else None
+
+def get_user_id(username: str):
+    """Look up a user's database ID by username."""
+    result = execute_prepared("SELECT id FROM users WHERE username = %s", (username,), fetch=True)
+    return result[0]['id'] if result else None
+
+def setUserSession(username: str, role: str, user_id=None):
+    """Set the current user session.
+
+    The user's database ID is resolved here, once per login, so per-sale code
+    never has to look it up again.
+    """
+    if user_id is None and username:
+        try:
+            user_id = get_user_id(username)
+        except Exception as e:
+            print(f"[AUTH] Could not resolve user ID for {username}: {e}")
     session["username"] = username
     session["role"] = role
+    session["user_id"] = user_id
 
 def getCurrentUser() -> dict:
     """Get the current user session information."""
@@ -41,6 +94,7 @@ def logout():
     """Clear the current user session."""
     session["username"] = None
     session["role"] = None
+    session["user_id"] = None
 
 def init_default_users():
     """Initialize the database with a default admin user if none exists."""
@@ -51,6 +105,3 @@ def init_default_users():
         # Create default admin user
         admin = Admin("admin", "admin123")
         admin.save()
-
-# Call this when the app starts
-init_default_users()
\ No newline at end of file
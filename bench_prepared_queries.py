@@ -0,0 +1,162 @@
+# Micro-benchmark for the hot-query path in db_config.
+#
+# Times per-call latency (pool checkout, execute, fetch, return) of the
+# statements run on every login, catalog check and checkout:
+#   reads  - user by username and the catalog version stamp
+#   writes - one sale: transaction INSERT, line-item INSERT, rollup upserts
+#            and the availability UPDATE, rolled back after every call
+# in these setups:
+#   before    - pure Python driver, plain text statements
+#   prepared  - pure Python driver, statements prepared per connection
+#   c-ext     - C extension driver, statements prepared per connection
+# The pool's session reset is off in all three, so they differ only in how
+# statements are sent. Its cost (the old default, one extra round trip per
+# checkout) is measured separately as "before+reset".
+# Each setup runs in its own process because the driver and the pool reset
+# are fixed when the pool is created.
+#
+# Run against a local MySQL loaded with the POSit schema (at least one
+# ticket and the rollup tables from rebuild_sales_rollups.py), e.g.
+#   python bench_prepared_queries.py --host localhost --user root --password secret --database posit_db
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SETUPS = [
+    # name, environment, pool session reset
+    ("before", {"POSIT_DB_C_EXTENSION": "0", "POSIT_DB_PREPARED": "0"}, False),
+    ("prepared", {"POSIT_DB_C_EXTENSION": "0", "POSIT_DB_PREPARED": "1"}, False),
+    ("c-ext", {"POSIT_DB_C_EXTENSION": "1", "POSIT_DB_PREPARED": "1"}, False),
+]
+# Reported on its own: the previous configuration, with the session reset
+RESET_SETUP = ("before+reset", {"POSIT_DB_C_EXTENSION": "0", "POSIT_DB_PREPARED": "0"}, True)
+
+READ_QUERIES = [
+    ("user by username", "SELECT * FROM users WHERE username = %s", ("admin",)),
+    ("catalog version", "SELECT COUNT(*) AS row_count, MAX(updated_at) AS last_updated FROM tickets", None),
+]
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _time(args, call):
+    for n in range(args.warmup):
+        call(n)
+    samples = []
+    for n in range(args.iterations):
+        start = time.perf_counter()
+        call(n)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return {
+        "mean": sum(samples) / len(samples),
+        "p50": _percentile(samples, 0.5),
+        "p95": _percentile(samples, 0.95),
+    }
+
+
+def _sale_write(ticket, n):
+    """Run one sale's statements the way save_sale and reserve_stock do, then roll back."""
+    import db_config
+    import sales
+    import tickets
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    connection = db_config.get_db_connection()
+    cursor = connection.cursor()
+    try:
+        transaction_db_id = db_config.run_prepared(
+            connection, sales.TRANSACTION_INSERT,
+            (f"BENCH-{os.getpid()}-{n}", None, 10.0, 1.0, 0.0, timestamp,
+             f"BENCH-{os.getpid()}-{n}", timestamp)).lastrowid
+        cursor.executemany(sales.TRANSACTION_ITEMS_INSERT,
+                           [(transaction_db_id, ticket['ticket_id'], 1, 10.0, timestamp)])
+        db_config.run_prepared(connection, sales.SALES_BY_DAY_UPSERT, (timestamp, 10.0, 1.0, 0.0))
+        db_config.run_prepared(connection, sales.SALES_BY_HOUR_UPSERT, (timestamp, timestamp, 10.0))
+        cursor.executemany(sales.SALES_BY_TICKET_UPSERT, [(timestamp, ticket['ticket_id'], 1, 10.0)])
+        # Quantity 0 matches the row without needing stock
+        db_config.run_prepared(connection, tickets._reserve_stock_query(1),
+                               (ticket['event'], ticket['tier'], 0))
+    finally:
+        cursor.close()
+        connection.rollback()
+        db_config.close_db_connection(connection)
+
+
+def run_setup(args):
+    """Time every statement with one setup; prints one JSON line of results."""
+    import db_config
+    db_config.DB_CONFIG.update(host=args.host, port=args.port, user=args.user,
+                               password=args.password, database=args.database,
+                               pool_reset_session=args.reset_session == "1")
+    # Plain text statements before, prepared ones after; writes go through
+    # run_prepared, which uses plain cursors when prepared statements are off
+    read = db_config.execute_prepared if db_config.USE_PREPARED_STATEMENTS else db_config.execute_query
+    results = {}
+    for name, query, params in READ_QUERIES:
+        results[name] = _time(args, lambda n: read(query, params, fetch=True))
+    ticket = db_config.execute_query("SELECT ticket_id, event, tier FROM tickets LIMIT 1", fetch=True)
+    if ticket:
+        results["sale write"] = _time(args, lambda n: _sale_write(ticket[0], n))
+    print(json.dumps(results))
+
+
+def _run_in_process(name, env, reset_session):
+    command = [sys.executable, __file__, "--reset-session", "1" if reset_session else "0"] + sys.argv[1:]
+    proc = subprocess.run(command, env=dict(os.environ, **env), capture_output=True, text=True)
+    if proc.returncode != 0:
+        print(f"{name}: failed\n{proc.stderr.strip()}")
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _print_table(results, names, baseline_name):
+    print(f"{'statement':<18} {'setup':<13} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'vs ' + baseline_name:>16}")
+    statements = [name for name, _, _ in READ_QUERIES] + ["sale write"]
+    for statement in statements:
+        baseline = results.get(baseline_name, {}).get(statement)
+        for name in names:
+            timing = results.get(name, {}).get(statement)
+            if not timing:
+                continue
+            speedup = f"{baseline['mean'] / timing['mean']:.2f}x" if baseline else "-"
+            print(f"{statement:<18} {name:<13} {timing['mean']:>10.1f} {timing['p50']:>10.1f} "
+                  f"{timing['p95']:>10.1f} {speedup:>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call latency of the hot POSit statements")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--database", default="posit_db")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--reset-session", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.reset_session is not None:
+        run_setup(args)
+        return
+
+    results = {}
+    for name, env, reset_session in SETUPS + [RESET_SETUP]:
+        timing = _run_in_process(name, env, reset_session)
+        if timing:
+            results[name] = timing
+
+    print("Statement execution (pool session reset off in every setup):")
+    _print_table(results, [name for name, _, _ in SETUPS], "before")
+    print()
+    print("Cost of the pool session reset (previous default):")
+    _print_table(results, ["before+reset", "before"], "before+reset")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Data provider for the admin dashboard.
+#
+# Computes every dashboard figure (today's sales and transaction count, the
+# hourly trend and the stock alerts) in one pass over the day's summary and
+# the ticket catalog, and memoizes the result. The memo is keyed on the
+# transaction files' size/mtime and the catalog generation, so re-entering
+# the dashboard with no new sales or stock changes reads nothing at all.
+#
+# A stale summary is re-parsed and the catalog may be reloaded, so
+# get_dashboard_data() is called from a worker thread, never the UI thread.
+
+import os
+import journal
+import summary_index
+from tickets import get_routes, get_catalog_generation
+
+LOW_STOCK_THRESHOLD = 10
+CRITICAL_STOCK_THRESHOLD = 5
+
+_cache = {'key': None, 'data': None}
+# Most recent day with transactions, keyed on the transactions directory's
+# mtime (adding or removing a day file changes it), so it is not relisted
+# on every visit
+_latest_day = {'key': None, 'day': None}
+
+
+def _trend_date(today_str):
+    # Today's transactions, or the most recent day's if today has none
+    if journal.day_exists(today_str):
+        return today_str
+    try:
+        key = os.stat(journal.TRANSACTIONS_DIR).st_mtime_ns
+    except FileNotFoundError:
+        return today_str
+    if key != _latest_day['key']:
+        days = journal.list_days()
+        _latest_day['day'] = days[0] if days else None
+        _latest_day['key'] = key
+    return _latest_day['day'] or today_str
+
+
+def _count_stock_alerts():
+    low_stock = 0
+    critical_stock = 0
+    stock_levels = {}
+    for item in get_routes():
+        try:
+            avail = int(item.get('availability', 0))
+            stock_levels[item['ticket_id']] = avail
+            if avail <= LOW_STOCK_THRESHOLD:
+                low_stock += 1
+            if avail <= CRITICAL_STOCK_THRESHOLD:
+                critical_stock += 1
+        except Exception:
+            continue
+    return low_stock, critical_stock, stock_levels
+
+
+def _empty_data(today_str, trend_date):
+    return {
+        'date': today_str,
+        'sales': 0.0,
+        'count': 0,
+        'error': None,
+        'trend_date': trend_date,
+        'hourly_counts': [0] * 24,
+        'low_stock': 0,
+        'critical_stock': 0,
+        'stock_levels': {},  # ticket_id -> availability
+        'loading': False
+    }
+
+
+def placeholder_data():
+    """Zeroed dashboard data, marked loading, to show until the first load finishes."""
+    today_str = journal.today_str()
+    return dict(_empty_data(today_str, today_str), loading=True)
+
+
+def _compute(today_str, trend_date):
+    data = _empty_data(today_str, trend_date)
+
+    if trend_date != today_str:
+        data['error'] = f"File not found: {journal.get_daily_filename(today_str)}"
+    try:
+        summary = summary_index.get_day_summary(trend_date)
+        if summary:
+            data['hourly_counts'] = list(summary['hourly_counts'])
+            if trend_date == today_str:
+                data['sales'] = summary['total_sales']
+                data['count'] = summary['transaction_count']
+    except Exception as e:
+        if trend_date == today_str:
+            data['error'] = f"Error parsing transactions for {today_str}: {e}"
+        print(f"[Dashboard] Could not read transactions for {trend_date}: {e}")
+
+    data['low_stock'], data['critical_stock'], data['stock_levels'] = _count_stock_alerts()
+    return data
+
+
+def get_dashboard_data():
+    """Return all dashboard figures, recomputed only when their sources changed.
+
+    The result is a dict with date, sales, count, error, trend_date,
+    hourly_counts, low_stock, critical_stock, stock_levels and loading.
+    Treat it as read-only; it is shared between calls. Call it off the UI
+    thread (see the module comment).
+    """
+    today_str = journal.today_str()
+    trend_date = _trend_date(today_str)
+    get_routes()  # Recheck the catalog; the generation below then only reads the cache
+    key = (today_str, trend_date, str(summary_index.source_stats(trend_date)),
+           get_catalog_generation(refresh=False))
+    if key != _cache['key']:
+        _cache['data'] = _compute(today_str, trend_date)
+        _cache['key'] = key
+    return _cache['data']
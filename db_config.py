@@ -1,13 +1,32 @@
 import mysql.connector
 from mysql.connector import pooling
 import logging
+import os
 import time
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import wraps
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Set POSIT_DB_C_EXTENSION=1 to use the MySQL Connector C extension; it
+# parses results much faster, but the pure Python driver stays the default
+# for its clearer errors.
+USE_C_EXTENSION = os.environ.get('POSIT_DB_C_EXTENSION') == '1'
+# Set POSIT_DB_PREPARED=1 to run hot queries as server-side prepared
+# statements kept per pooled connection (see run_prepared). Off by default:
+# the pure Python driver's prepared cursor sends COM_STMT_RESET before every
+# execute, so each statement costs two round trips instead of one. Turn it
+# on only where bench_prepared_queries.py shows a gain against the real server.
+USE_PREPARED_STATEMENTS = os.environ.get('POSIT_DB_PREPARED') == '1'
+# Prepared statements kept per connection; the least recently used is
+# deallocated beyond this
+MAX_PREPARED_PER_CONNECTION = 32
+
 # Database configuration
 DB_CONFIG = {
     'host': 'sql12.freesqldatabase.com',
@@ -17,14 +36,38 @@ DB_CONFIG = {
     'port': 3306,
     'connect_timeout': 10,  # Connection timeout in seconds
     'connection_timeout': 10,  # Timeout for operations
-    'pool_reset_session': True,  # Reset session variables when connection is returned to pool
+    # Reset session variables when a connection is returned to the pool. A
+    # reset also deallocates prepared statements, so it is skipped when they
+    # are cached across checkouts (the app sets no session state of its own).
+    'pool_reset_session': not USE_PREPARED_STATEMENTS,
     'pool_name': 'mypool',
     'pool_size': 5,
-    'use_pure': True,  # Use pure Python implementation for better error handling
+    'use_pure': not USE_C_EXTENSION,
+}
+
+# Rows fetched per round trip by iter_query
+ITER_BATCH_SIZE = 500
+
+# iter_query row_type -> cursor options
+_ROW_TYPES = {
+    'dict': {'dictionary': True},
+    'tuple': {},
+    'namedtuple': {'named_tuple': True},
 }
 
-# Global connection pool
+# Cached statement cursors per underlying connection and server session:
+# connection -> (connection_id, OrderedDict(query -> cursor)), least
+# recently used first
+_statement_cache = weakref.WeakKeyDictionary()
+_statement_lock = threading.Lock()
+# Server error for a statement id the session does not know (deallocated, or
+# prepared in a session that has since been replaced)
+ER_UNKNOWN_STMT_HANDLER = 1243
+
+# Global connection pool, created on first use (see ensure_connection_pool)
 connection_pool = None
+_pool_lock = threading.Lock()
+_pool_attempted = False
 
 def init_connection_pool():
     """Initialize the connection pool with retry mechanism."""
@@ -45,8 +88,25 @@ def init_connection_pool():
                 logger.error("Failed to create connection pool after all retries")
                 return False
 
+def ensure_connection_pool(retry_failed=False):
+    """Create the connection pool the first time it is needed.
+
+    Importing this module no longer connects to anything; the pool is built
+    by whichever caller needs a connection first. Returns True if the pool
+    exists (False means callers fall back to direct connections). With
+    retry_failed, a pool that could not be created earlier is tried again.
+    """
+    global _pool_attempted
+    if not _pool_attempted or (retry_failed and connection_pool is None):
+        with _pool_lock:
+            if not _pool_attempted or (retry_failed and connection_pool is None):
+                init_connection_pool()
+                _pool_attempted = True
+    return connection_pool is not None
+
 def get_db_connection():
     """Get a connection from the pool with retry mechanism."""
+    ensure_connection_pool()
     max_retries = 3
     retry_delay = 1  # seconds
     
@@ -54,7 +114,8 @@ def get_db_connection():
         try:
             if connection_pool:
                 conn = connection_pool.get_connection()
-                # Validate connection
+                # Validate connection (the pool usually reconnects a dropped
+                # one itself; run_prepared notices the new session either way)
                 if not conn.is_connected():
                     conn.reconnect(attempts=3, delay=1)
                 return conn
@@ -72,6 +133,12 @@ def close_db_connection(connection):
     """Return a connection to the pool safely."""
     try:
         if connection and connection.is_connected():
+            if not DB_CONFIG.get('pool_reset_session', True):
+                # With autocommit off even a plain read opens a transaction
+                # (and a REPEATABLE READ snapshot); without the pool's session
+                # reset it must be ended here, or the next user of this
+                # connection would keep reading that stale snapshot
+                connection.rollback()
             connection.close()
     except Exception as e:
         logger.error(f"Error closing database connection: {e}")
@@ -97,6 +164,158 @@ def with_db_retry(max_retries=3, retry_delay=1):
         return wrapper
     return decorator
 
+def _raw_connection(connection):
+    # Pooled connections are fresh wrappers on every checkout; statements
+    # belong to the underlying connection they wrap
+    return getattr(connection, '_cnx', None) or connection
+
+def run_prepared(connection, query, params=None):
+    """Execute query on connection through a statement kept prepared on it.
+
+    The first call prepares the statement on the server; later ones, on
+    any checkout of the same pooled connection, only send parameters.
+    Returns the cursor for rowcount, lastrowid or fetching; rows are tuples
+    (see cursor.column_names) and must all be read before the connection
+    runs anything else. The cursor belongs to the cache, so do not close
+    it. With USE_PREPARED_STATEMENTS off a plain cursor is used.
+    """
+    raw = _raw_connection(connection)
+    try:
+        return _execute_cached(raw, query, params)
+    except mysql.connector.Error as e:
+        if e.errno != ER_UNKNOWN_STMT_HANDLER:
+            raise
+        # The server lost the statement; prepare it again and retry once
+        logger.warning(f"Prepared statement was lost, preparing it again: {e}")
+        forget_statements(raw)
+        return _execute_cached(raw, query, params)
+
+def _session_statements(raw):
+    # The statements cached for raw's current server session. A reconnect,
+    # including the one the pool makes on checkout, starts a session with
+    # none prepared, so a changed connection_id drops the old cursors first
+    session_id = raw.connection_id
+    with _statement_lock:
+        cached = _statement_cache.get(raw)
+        if cached is not None and cached[0] == session_id:
+            return cached[1]
+        statements = OrderedDict()
+        _statement_cache[raw] = (session_id, statements)
+    # Closed before anything is prepared in the new session, so their stale
+    # statement ids cannot match a live statement
+    for _, cursor in (cached[1] if cached else {}).values():
+        _close_quietly(cursor)
+    return statements
+
+def _execute_cached(raw, query, params):
+    statements = _session_statements(raw)
+    entry = statements.get(query)
+    if entry is None:
+        entry = (query, raw.cursor(prepared=USE_PREPARED_STATEMENTS))
+        statements[query] = entry
+        if len(statements) > MAX_PREPARED_PER_CONNECTION:
+            _, (_, oldest) = statements.popitem(last=False)
+            _close_quietly(oldest)
+    else:
+        statements.move_to_end(query)
+    # The driver recognises a statement it already prepared by the query
+    # object it was given, so always pass the cached one
+    cached_query, cursor = entry
+    cursor.execute(cached_query, params or ())
+    return cursor
+
+def _close_quietly(cursor):
+    try:
+        cursor.close()
+    except Exception:
+        pass
+
+def forget_statements(connection):
+    """Drop a connection's cached statements (after a reconnect or an error)."""
+    with _statement_lock:
+        cached = _statement_cache.pop(_raw_connection(connection), None)
+    for _, cursor in (cached[1] if cached else {}).values():
+        _close_quietly(cursor)
+
+@contextmanager
+def transaction(connection=None, dictionary=True):
+    """Run several statements on one connection as a single DB transaction.
+
+    Yields a cursor; commits when the block finishes and rolls back if it
+    raises. A given connection is reused and left open, so a caller can run
+    several transactions over it; otherwise one is taken from the pool and
+    returned afterwards. The block itself is not replayed on failure: to
+    retry a whole unit of work, put it in a function decorated with
+    with_db_retry().
+    """
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_db_connection()
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=dictionary)
+        yield cursor
+        connection.commit()
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception as e:
+            logger.error(f"Error rolling back transaction: {e}")
+        # Statements may have been lost with the session; prepare them again
+        forget_statements(connection)
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if owns_connection:
+            close_db_connection(connection)
+
+@with_db_retry()
+def execute_many(query, rows):
+    """Run one statement for every parameter tuple in rows, with one commit.
+
+    All rows go over a single pooled connection (multi-row INSERTs are sent
+    as one statement by the driver) and are committed together. Returns the
+    affected row count.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    with transaction(dictionary=False) as cursor:
+        cursor.executemany(query, rows)
+        return cursor.rowcount
+
+@with_db_retry()
+def execute_prepared(query, params=None, fetch=False):
+    """Like execute_query, through a statement prepared once per connection.
+
+    For the handful of statements run on every login, checkout or catalog
+    check; one-off queries should keep using execute_query.
+    """
+    connection = None
+    try:
+        connection = get_db_connection()
+        cursor = run_prepared(connection, query, params)
+        if fetch:
+            columns = cursor.column_names
+            result = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        else:
+            connection.commit()
+            result = None
+        return result
+    except Exception as e:
+        if connection:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            forget_statements(connection)
+        logger.error(f"Error executing prepared query: {e}")
+        raise
+    finally:
+        if connection:
+            close_db_connection(connection)
+
 @with_db_retry()
 def execute_query(query, params=None, fetch=False):
     """Execute a database query using a connection from the pool."""
@@ -129,5 +348,38 @@ def execute_query(query, params=None, fetch=False):
         if connection:
             close_db_connection(connection)
 
-# Initialize connection pool on module import
-init_connection_pool() 
\ No newline at end of file
+def iter_query(query, params=None, batch_size=ITER_BATCH_SIZE, row_type='dict'):
+    """Stream the rows of a query instead of loading them all at once.
+
+    Rows are read over an unbuffered cursor, batch_size at a time, so memory
+    stays flat however large the result. row_type is 'dict' (like
+    execute_query), 'tuple' or 'namedtuple'. The connection is held until
+    the generator is exhausted or closed (a for loop that breaks early, or
+    the generator being garbage collected, both close it); it is not
+    retried once rows have started arriving.
+    """
+    cursor_options = _ROW_TYPES[row_type]
+    connection = get_db_connection()
+    cursor = None
+    try:
+        cursor = connection.cursor(buffered=False, **cursor_options)
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        try:
+            if cursor:
+                # An abandoned unbuffered result must be drained before the
+                # connection can run anything else
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"Error closing streaming cursor: {e}")
+        close_db_connection(connection)
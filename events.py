@@ -0,0 +1,42 @@
+# In-process event bus.
+#
+# Screens that change sales or stock publish what happened, and screens that
+# display those figures (the admin dashboard) subscribe and patch their
+# widgets instead of recomputing everything. Callbacks run synchronously on
+# the publishing thread; subscribers that touch widgets should hop onto the
+# Kivy thread with Clock.schedule_once.
+
+import threading
+
+# A checkout was completed. Payload: record (the transaction record dict).
+SALE_COMPLETED = "sale_completed"
+# A ticket was added, edited, restocked or deleted. Payload: ticket_id and
+# ticket (the ticket dict as saved, or None if it was deleted).
+STOCK_CHANGED = "stock_changed"
+
+_subscribers = {}
+_lock = threading.Lock()
+
+
+def subscribe(event, callback):
+    """Register callback(**payload) for an event."""
+    with _lock:
+        _subscribers.setdefault(event, []).append(callback)
+
+
+def unsubscribe(event, callback):
+    with _lock:
+        callbacks = _subscribers.get(event, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+
+def publish(event, **payload):
+    """Call every subscriber of an event; a failing subscriber does not stop the rest."""
+    with _lock:
+        callbacks = list(_subscribers.get(event, []))
+    for callback in callbacks:
+        try:
+            callback(**payload)
+        except Exception as e:
+            print(f"[EVENTS] Subscriber error for {event}: {e}")
@@ -1,12 +1,9 @@
-import mysql.connector
-from db_config import DB_CONFIG
-import bcrypt
+from db_config import execute_query, execute_many
+from models import hash_password
 
 def hash_passwords():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id, username, password FROM users")
-    users = cursor.fetchall()
+    users = execute_query("SELECT id, username, password FROM users", fetch=True)
+    updates = []
     for user in users:
         # Skip if already hashed
         if isinstance(user['password'], str) and user['password'].startswith('$2b$'):
@@ -15,13 +12,12 @@ def hash_passwords():
         password = user['password']
         if isinstance(password, bytes):
             password = password.decode('utf-8')
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        cursor.execute("UPDATE users SET password = %s WHERE id = %s", (hashed, user['id']))
-        print(f"Updated password for user {user['username']}")
-    conn.commit()
-    cursor.close()
-    conn.close()
+        hashed = hash_password(password).decode('utf-8')
+        updates.append((hashed, user['id']))
+        print(f"Hashed password for user {user['username']}")
+    # Every update goes over one connection with a single commit
+    execute_many("UPDATE users SET password = %s WHERE id = %s", updates)
     print("All passwords hashed.")
 
 if __name__ == "__main__":
-    hash_passwords() 
\ No newline at end of file
+    hash_passwords() 
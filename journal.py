@@ -0,0 +1,179 @@
+# Append-only transaction journal.
+#
+# Every checkout is appended to transactions/transactions_<date>.journal as a
+# single-line <Transaction> XML fragment and fsync'd, so saving a sale costs the
+# same whether it is the first or the five-thousandth of the day. The journal is
+# folded into the usual DailyTransactions XML file by compact_journal(), which
+# runs for past days on startup and for today when the app stops.
+
+import xml.etree.ElementTree as ET
+import os
+from datetime import date
+
+TRANSACTIONS_DIR = "transactions"
+DAILY_ROOT_TAG = "DailyTransactions"
+
+
+def _ensure_dir():
+    if not os.path.exists(TRANSACTIONS_DIR):
+        os.makedirs(TRANSACTIONS_DIR)
+
+
+def today_str():
+    """Return today's date in the YYYY-MM-DD form used in file names."""
+    return date.today().strftime("%Y-%m-%d")
+
+
+def get_daily_filename(date_str):
+    """Path of the compacted DailyTransactions XML file for a day."""
+    return os.path.join(TRANSACTIONS_DIR, f"transactions_{date_str}.xml")
+
+
+def get_journal_filename(date_str):
+    """Path of the append-only journal for a day."""
+    return os.path.join(TRANSACTIONS_DIR, f"transactions_{date_str}.journal")
+
+
+def day_exists(date_str):
+    """Check whether any transaction data (compacted or journaled) exists for a day."""
+    return os.path.exists(get_daily_filename(date_str)) or os.path.exists(get_journal_filename(date_str))
+
+
+def list_days():
+    """Return all dates that have transaction data, newest first."""
+    if not os.path.exists(TRANSACTIONS_DIR):
+        return []
+    days = set()
+    for name in os.listdir(TRANSACTIONS_DIR):
+        if not name.startswith("transactions_"):
+            continue
+        for ext in (".xml", ".journal"):
+            if name.endswith(ext):
+                days.add(name[len("transactions_"):-len(ext)])
+    return sorted(days, reverse=True)
+
+
+def append_transaction(transaction_element, date_str=None):
+    """Append one <Transaction> element to the day's journal and fsync it.
+
+    Returns the journal filename.
+    """
+    _ensure_dir()
+    journal_filename = get_journal_filename(date_str or today_str())
+    # Serialize without indentation so the record stays on one line
+    record = ET.tostring(transaction_element, encoding="unicode").replace("\n", "&#10;")
+    with open(journal_filename, "a", encoding="utf-8") as f:
+        f.write(record + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return journal_filename
+
+
+def _iter_journal(journal_filename):
+    with open(journal_filename, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield ET.fromstring(line)
+            except ET.ParseError:
+                # A torn final record from a crash mid-write; skip it
+                print(f"[JOURNAL] Warning: Skipping unreadable record in {journal_filename}")
+
+
+def _iter_daily_file(daily_filename, release=True):
+    """Stream the <Transaction> elements of a DailyTransactions file.
+
+    The file is read with iterparse, so memory stays flat however large the
+    day gets. With release=True each element is cleared and detached once
+    the consumer asks for the next one; pass release=False to keep them.
+    """
+    depth = 0
+    daily_root = None
+    for event, elem in ET.iterparse(daily_filename, events=("start", "end")):
+        if event == "start":
+            if daily_root is None:
+                daily_root = elem
+                if elem.tag != DAILY_ROOT_TAG:
+                    raise ValueError(f"Invalid XML format in {daily_filename}. Expected root tag '{DAILY_ROOT_TAG}'.")
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1 and elem.tag == "Transaction":
+            yield elem
+            if release:
+                elem.clear()
+                daily_root.remove(elem)
+
+
+def iter_transactions(date_str):
+    """Yield every <Transaction> element recorded for a day.
+
+    Compacted transactions come first, followed by anything still in the
+    journal. Elements from the compacted file are streamed and released as
+    the iteration advances, so read what you need before moving on. Raises
+    ET.ParseError or ValueError if the compacted file is unreadable.
+    """
+    daily_filename = get_daily_filename(date_str)
+    journal_filename = get_journal_filename(date_str)
+    if os.path.exists(daily_filename):
+        yield from _iter_daily_file(daily_filename)
+    if os.path.exists(journal_filename):
+        yield from _iter_journal(journal_filename)
+
+
+def compact_journal(date_str):
+    """Fold a day's journal into its DailyTransactions XML file.
+
+    The XML file is rewritten atomically and the journal removed afterwards.
+    Transactions already present in the XML file (for example after a crash
+    between the two steps) are not duplicated. Returns True if anything was
+    compacted.
+    """
+    journal_filename = get_journal_filename(date_str)
+    if not os.path.exists(journal_filename):
+        return False
+
+    daily_filename = get_daily_filename(date_str)
+    daily_root = ET.Element(DAILY_ROOT_TAG)
+    seen_ids = set()
+    if os.path.exists(daily_filename):
+        try:
+            for trans_elem in _iter_daily_file(daily_filename, release=False):
+                daily_root.append(trans_elem)
+                seen_ids.add(trans_elem.findtext("TransactionID"))
+        except (ET.ParseError, ValueError) as e:
+            # Never overwrite a file we could not read
+            print(f"[JOURNAL] Cannot compact {journal_filename}: {e}")
+            return False
+
+    appended = 0
+    for trans_elem in _iter_journal(journal_filename):
+        if trans_elem.findtext("TransactionID") in seen_ids:
+            continue
+        daily_root.append(trans_elem)
+        appended += 1
+
+    tree = ET.ElementTree(daily_root)
+    ET.indent(tree, space="\t", level=0)
+    tmp_filename = daily_filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        tree.write(f, encoding="utf-8", xml_declaration=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, daily_filename)
+    os.remove(journal_filename)
+    print(f"[JOURNAL] Compacted {appended} transaction(s) into {daily_filename}")
+    return True
+
+
+def compact_stale_journals():
+    """Compact the journals of every day before today."""
+    current_day = today_str()
+    for day in list_days():
+        if day < current_day and os.path.exists(get_journal_filename(day)):
+            try:
+                compact_journal(day)
+            except Exception as e:
+                print(f"[JOURNAL] Error compacting journal for {day}: {e}")
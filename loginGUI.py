@@ -10,16 +10,17 @@ from kivy.uix.image import Image
 from kivy.uix.floatlayout import FloatLayout
 from kivy.uix.widget import Widget
 from kivy.core.window import Window
+from kivy.clock import Clock
 
 import auth
+import startup
 from models import User, Admin
 
 ACCENT_BLUE = (0.22, 0.27, 0.74, 1)
 
 class LoginScreen(Screen):
-    def __init__(self, users, **kwargs):
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.users = users
 
         # Root layout: horizontal BoxLayout fills the window
         root_layout = BoxLayout(orientation='horizontal')
@@ -178,6 +179,10 @@ class LoginScreen(Screen):
         )
         form_box.add_widget(self.message)
 
+        # The database connects in the background; logging in waits for it
+        startup.add_listener(lambda state, error: Clock.schedule_once(lambda dt: self._show_db_state(state, error)))
+        self._show_db_state(*startup.get_state())
+
         # Info text
         info = Label(text="This is a secure system exclusively for POSit authorized personnel.\nFor account assistance, please contact your system administrator.", color=(0.5,0.5,0.5,1), font_size=dp(12), size_hint=(1, None), height=dp(40), halign='left', valign='top')
         info.bind(size=lambda inst, val: setattr(inst, 'text_size', (inst.width, None)))
@@ -222,12 +227,44 @@ class LoginScreen(Screen):
         if instance.texture_size[1] > instance.height:
             instance.text_size = (instance.width, instance.height)
 
+    def _show_db_state(self, state, error):
+        if state == startup.READY:
+            self.login_btn.disabled = False
+            self.login_btn.text = "Login"
+            if self.message.text.startswith("Database"):
+                self.message.text = ""
+        elif state == startup.FAILED:
+            self.login_btn.disabled = False
+            self.login_btn.text = "Retry Connection"
+            self.message.text = "Database unavailable. Check the connection and retry."
+        else:
+            self.login_btn.disabled = True
+            self.login_btn.text = "Connecting to database..."
+
     def login(self, instance):
+        if not startup.is_ready():
+            state, error = startup.get_state()
+            if state == startup.FAILED:
+                startup.start()
+            return
+        if self.login_btn.disabled:
+            return  # A login is already being checked
         uname = self.username.text
         pword = self.password.text
-        role = auth.authUser(self.users, uname, pword)
+        # bcrypt is slow by design; check the password off the UI thread
+        self.login_btn.disabled = True
+        self.message.text = "Signing in..."
+        auth.authenticate_async(uname, pword, lambda user, error: Clock.schedule_once(lambda dt: self._on_authenticated(uname, user, error)))
+
+    def _on_authenticated(self, uname, user, error):
+        self.login_btn.disabled = False
+        if error:
+            print(f"[LOGIN] Authentication failed: {error}")
+            self.message.text = "Could not reach the database. Please try again."
+            return
+        role = user.role if user else None
         if role:
-            auth.setUserSession(uname, role)
+            auth.setUserSession(uname, role, user_id=user.id)
             self.message.text = f"Welcome {uname} ({role})"
             if role == "admin":
                 self.manager.current = "admin_dashboard"
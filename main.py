@@ -41,14 +41,27 @@ from kivy.metrics import dp
 from kivy.properties import ObjectProperty
 from kivy.uix.screenmanager import Screen
 
-from loginGUI import LoginScreen
-from adminDashGUI import AdminDashboard
-from userGUI import MainScreen
-from adminInventory import AdminInventoryScreen
-from userManagement import UserManagementScreen
-from reportsGUI import ReportScreen
 from models import User, Admin
 import auth
+import journal
+import sync_queue
+import startup
+import importlib
+
+# Screen name -> (module, class). Screen modules, and the heavy
+# dependencies they pull in, are imported the first time a screen is shown.
+SCREENS = {
+    'login': ('loginGUI', 'LoginScreen'),
+    'admin_dashboard': ('adminDashGUI', 'AdminDashboard'),
+    'user_dashboard': ('userGUI', 'MainScreen'),
+    'admin_inventory': ('adminInventory', 'AdminInventoryScreen'),
+    'user_management': ('userManagement', 'UserManagementScreen'),
+    'reports_screen': ('reportsGUI', 'ReportScreen')
+}
+
+def _screen_class(screen_name):
+    module_name, class_name = SCREENS[screen_name]
+    return getattr(importlib.import_module(module_name), class_name)
 
 class CachedScreenManager(ScreenManager):
     """A ScreenManager that caches screen instances."""
@@ -56,12 +69,12 @@ class CachedScreenManager(ScreenManager):
         super().__init__(**kwargs)
         self._screen_cache = {}
         self._screen_constructors = {
-            'login': lambda: LoginScreen(users=auth.get_users(), name='login'),
-            'admin_dashboard': lambda: AdminDashboard(name='admin_dashboard'),
-            'user_dashboard': lambda: MainScreen(name='user_dashboard'),
-            'admin_inventory': lambda: AdminInventoryScreen(name='admin_inventory'),
-            'user_management': lambda: UserManagementScreen(name='user_management'),
-            'reports_screen': lambda: ReportScreen(name='reports_screen')
+            'login': lambda: _screen_class('login')(name='login'),
+            'admin_dashboard': lambda: _screen_class('admin_dashboard')(name='admin_dashboard'),
+            'user_dashboard': lambda: _screen_class('user_dashboard')(name='user_dashboard'),
+            'admin_inventory': lambda: _screen_class('admin_inventory')(name='admin_inventory'),
+            'user_management': lambda: _screen_class('user_management')(name='user_management'),
+            'reports_screen': lambda: _screen_class('reports_screen')(name='reports_screen')
         }
         
         # Pre-initialize the login screen since it's the first screen
@@ -91,8 +104,12 @@ class POSitApp(App):
         Window.minimum_width = 1000
         Window.minimum_height = 600
 
-        # Initialize default admin user if not exists
-        auth.init_default_users()
+        # Connect to the database and create the default admin user in the
+        # background; the login screen enables itself once this is ready
+        startup.start()
+
+        # Start draining any sales queued for the database
+        sync_queue.start_worker()
 
         # Create screen manager with caching
         sm = CachedScreenManager()
@@ -102,6 +119,11 @@ class POSitApp(App):
         
         return sm
 
+    def on_stop(self):
+        sync_queue.stop_worker()
+        # Fold today's append-only journal into the daily XML file
+        journal.compact_journal(journal.today_str())
+
 if __name__ == '__main__':
     POSitApp().run()
         
\ No newline at end of file
@@ -1,18 +1,12 @@
-import mysql.connector
-from db_config import DB_CONFIG
+from db_config import transaction
 
 def migrate_column_type():
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
     try:
-        cursor.execute("ALTER TABLE users MODIFY COLUMN password VARCHAR(100) NOT NULL")
-        conn.commit()
+        with transaction() as cursor:
+            cursor.execute("ALTER TABLE users MODIFY COLUMN password VARCHAR(100) NOT NULL")
         print("Column type changed successfully.")
     except Exception as e:
         print(f"Error: {e}")
-    finally:
-        cursor.close()
-        conn.close()
 
 if __name__ == "__main__":
-    migrate_column_type() 
\ No newline at end of file
+    migrate_column_type() 
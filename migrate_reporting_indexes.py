@@ -0,0 +1,32 @@
+import mysql.connector
+from db_config import transaction
+
+# (table, index name, columns). The created_at indexes lead with the range
+# column and carry the summed columns, so the report_queries.py aggregates
+# are answered from the index without touching the table rows.
+REPORTING_INDEXES = [
+    ("transactions", "idx_transactions_created_at",
+     "created_at, user_id, total_amount, tax_amount, discount_amount"),
+    ("transactions", "idx_transactions_user_id", "user_id, created_at"),
+    ("transaction_items", "idx_transaction_items_created_at",
+     "created_at, ticket_id, quantity, price_at_sale"),
+    ("transaction_items", "idx_transaction_items_ticket_id", "ticket_id, created_at"),
+]
+
+def migrate_reporting_indexes():
+    """Add the indexes used by the SQL sales reports."""
+    try:
+        with transaction() as cursor:
+            for table, index_name, columns in REPORTING_INDEXES:
+                cursor.execute(f"SHOW INDEX FROM {table} WHERE Key_name = %s", (index_name,))
+                if cursor.fetchall():
+                    print(f"{table}.{index_name} already exists, skipping.")
+                    continue
+                print(f"Adding index {index_name} on {table} ({columns})...")
+                cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+        print("Migration completed successfully!")
+    except mysql.connector.Error as err:
+        print(f"Error during migration: {err}")
+
+if __name__ == "__main__":
+    migrate_reporting_indexes()
@@ -0,0 +1,37 @@
+import mysql.connector
+from db_config import transaction
+
+# Microsecond precision: with whole seconds, a second write to a row within
+# the same second as the cache's snapshot would leave the stamp unchanged
+UPDATED_AT_DEFINITION = (
+    "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+)
+
+def migrate_ticket_versioning():
+    """Add the tickets.updated_at version stamp used by the catalog cache."""
+    try:
+        with transaction() as cursor:
+            cursor.execute("SHOW COLUMNS FROM tickets WHERE Field = 'updated_at'")
+            column = cursor.fetchone()
+            column_type = column['Type'] if column else ''
+            if isinstance(column_type, (bytes, bytearray)):
+                column_type = column_type.decode('utf-8')
+            if not column:
+                print("Adding updated_at column to tickets...")
+                cursor.execute(f"ALTER TABLE tickets ADD COLUMN updated_at {UPDATED_AT_DEFINITION}")
+            elif column_type.lower() != 'timestamp(6)':
+                print("Changing tickets.updated_at to microsecond precision...")
+                cursor.execute(f"ALTER TABLE tickets MODIFY COLUMN updated_at {UPDATED_AT_DEFINITION}")
+            else:
+                print("tickets.updated_at already exists, skipping.")
+
+            cursor.execute("SHOW INDEX FROM tickets WHERE Key_name = 'idx_tickets_updated_at'")
+            if not cursor.fetchall():
+                print("Adding index on tickets.updated_at...")
+                cursor.execute("CREATE INDEX idx_tickets_updated_at ON tickets (updated_at)")
+        print("Migration completed successfully!")
+    except mysql.connector.Error as err:
+        print(f"Error during migration: {err}")
+
+if __name__ == "__main__":
+    migrate_ticket_versioning()
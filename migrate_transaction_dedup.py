@@ -0,0 +1,38 @@
+import mysql.connector
+from db_config import transaction
+
+INDEX_NAME = "uq_transactions_transaction_id_created_at"
+
+def migrate_transaction_dedup():
+    """Add the unique key that stops a replayed sale being stored twice.
+
+    sales.save_sale() already skips a sale whose (transaction_id, created_at)
+    is stored; the key enforces it and lets that check use an index.
+    Existing duplicates have to be removed by hand first.
+    """
+    try:
+        with transaction() as cursor:
+            cursor.execute("SHOW INDEX FROM transactions WHERE Key_name = %s", (INDEX_NAME,))
+            if cursor.fetchall():
+                print(f"transactions.{INDEX_NAME} already exists, skipping.")
+            else:
+                cursor.execute("""
+                    SELECT transaction_id, created_at, COUNT(*) AS copies
+                    FROM transactions
+                    GROUP BY transaction_id, created_at
+                    HAVING COUNT(*) > 1
+                """)
+                duplicates = cursor.fetchall()
+                if duplicates:
+                    print(f"Found {len(duplicates)} duplicated sales; remove the extra copies first:")
+                    for row in duplicates:
+                        print(f"  {row['transaction_id']} at {row['created_at']}: {row['copies']} rows")
+                    return
+                print(f"Adding unique key {INDEX_NAME} on transactions...")
+                cursor.execute(f"CREATE UNIQUE INDEX {INDEX_NAME} ON transactions (transaction_id, created_at)")
+        print("Migration completed successfully!")
+    except mysql.connector.Error as err:
+        print(f"Error during migration: {err}")
+
+if __name__ == "__main__":
+    migrate_transaction_dedup()
@@ -1,23 +1,58 @@
+import os
 import bcrypt
-from db_config import execute_query
+from db_config import execute_query, execute_prepared
+
+# bcrypt cost factor for new password hashes; set POSIT_BCRYPT_ROUNDS to
+# change it. Stored hashes with a different cost are rehashed at next login.
+BCRYPT_ROUNDS = int(os.environ.get('POSIT_BCRYPT_ROUNDS', '12'))
+
+def hash_password(password):
+    """Hash a password using bcrypt at the configured cost."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
+
+def _as_bytes(hashed):
+    # Stored hashes may come back as str, bytes or (prepared statements) bytearray
+    return hashed.encode('utf-8') if isinstance(hashed, str) else bytes(hashed)
 
 class User:
-    def __init__(self, username, password, role='user'):
+    def __init__(self, username, password=None, role='user'):
+        """Create a user; a plaintext password, if given, is hashed."""
         self.username = username
-        self.password = self._hash_password(password)
+        self.password = hash_password(password) if password is not None else None
         self.role = role
+        self.id = None
 
-    def _hash_password(self, password):
-        """Hash a password using bcrypt."""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt)
+    @classmethod
+    def from_row(cls, row):
+        """Build a User from a users table row. Nothing is hashed."""
+        user = User(row['username'], role=row['role'])
+        user.password = row.get('password')  # The stored hash, if selected
+        user.id = row.get('id')
+        return user
+
+    def set_password(self, password):
+        self.password = hash_password(password)
 
     def verify_password(self, password):
-        """Verify a password against the stored hash."""
-        hashed = self.password
-        if isinstance(hashed, str):
-            hashed = hashed.encode('utf-8')
-        return bcrypt.checkpw(password.encode('utf-8'), hashed)
+        """Verify a password against the stored hash.
+
+        This is deliberately slow (bcrypt); call it off the UI thread.
+        """
+        if not self.password:
+            return False
+        return bcrypt.checkpw(password.encode('utf-8'), _as_bytes(self.password))
+
+    def needs_rehash(self):
+        """Check whether the stored hash uses a different cost than BCRYPT_ROUNDS."""
+        try:
+            # Hashes look like $2b$<rounds>$<salt and hash>
+            return int(_as_bytes(self.password).split(b'$')[2]) != BCRYPT_ROUNDS
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    def save_password(self):
+        """Store this user's current password hash."""
+        execute_query("UPDATE users SET password = %s WHERE id = %s", (self.password, self.id))
 
     def __repr__(self):
         return f"User(username='{self.username}', role='{self.role}')"
@@ -26,12 +61,9 @@ class User:
     def get_by_username(username):
         """Get a user from the database by username."""
         query = "SELECT * FROM users WHERE username = %s"
-        result = execute_query(query, (username,), fetch=True)
+        result = execute_prepared(query, (username,), fetch=True)
         if result and len(result) > 0:
-            user_data = result[0]
-            user = User(user_data['username'], '', user_data['role'])
-            user.password = user_data['password']  # Store the hashed password
-            return user
+            return User.from_row(result[0])
         return None
 
     def save(self):
@@ -48,37 +80,44 @@ class User:
 class Admin(User):
     def __init__(self, username, password):
         super().__init__(username, password, 'admin')
-        self.users = self.load_users()
+        self._users = None
+
+    @property
+    def users(self):
+        """Non-admin users, loaded from the database on first access."""
+        if self._users is None:
+            self._users = self.load_users()
+        return self._users
 
     def load_users(self):
         """Load all non-admin users from the database."""
         query = "SELECT * FROM users WHERE role = 'user'"
         result = execute_query(query, fetch=True)
-        return [User(user['username'], user['password'], user['role']) for user in result]
+        return [User.from_row(user) for user in result]
 
     def addUser(self, username, password):
         """Add a new user to the database."""
         new_user = User(username, password, 'user')
         new_user.save()
-        self.users = self.load_users()
+        self._users = None
 
     def removeUser(self, username):
         """Remove a user from the database."""
         query = "DELETE FROM users WHERE username = %s AND role = 'user'"
         execute_query(query, (username,))
-        self.users = self.load_users()
+        self._users = None
 
     def addAdmin(self, username):
         """Grant admin privileges to a user."""
         query = "UPDATE users SET role = 'admin' WHERE username = %s"
         execute_query(query, (username,))
-        self.users = self.load_users()
+        self._users = None
 
     def removeAdmin(self, username):
         """Revoke admin privileges from a user."""
         query = "UPDATE users SET role = 'user' WHERE username = %s"
         execute_query(query, (username,))
-        self.users = self.load_users()
+        self._users = None
 
     def __repr__(self):
         return f"Admin(username='{self.username}', users={len(self.users)})"
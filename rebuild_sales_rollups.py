@@ -0,0 +1,105 @@
+import mysql.connector
+from db_config import transaction
+
+# Same type as tickets.ticket_id / transaction_items.ticket_id ('EVT-001')
+TICKET_ID_TYPE = "VARCHAR(50)"
+
+# Rollup tables kept up to date by sales.save_sale(); one row per day, per
+# day and hour, and per day and ticket
+ROLLUP_TABLES = {
+    "sales_by_day": """
+        CREATE TABLE IF NOT EXISTS sales_by_day (
+            day DATE NOT NULL PRIMARY KEY,
+            transaction_count INT NOT NULL DEFAULT 0,
+            total_sales DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            total_tax DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            total_discount DECIMAL(14, 2) NOT NULL DEFAULT 0
+        )
+    """,
+    "sales_by_hour": """
+        CREATE TABLE IF NOT EXISTS sales_by_hour (
+            day DATE NOT NULL,
+            hour TINYINT NOT NULL,
+            transaction_count INT NOT NULL DEFAULT 0,
+            total_sales DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour)
+        )
+    """,
+    "sales_by_ticket": f"""
+        CREATE TABLE IF NOT EXISTS sales_by_ticket (
+            day DATE NOT NULL,
+            ticket_id {TICKET_ID_TYPE} NOT NULL,
+            quantity INT NOT NULL DEFAULT 0,
+            sales DECIMAL(14, 2) NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, ticket_id),
+            INDEX idx_sales_by_ticket_ticket_id (ticket_id, day)
+        )
+    """,
+}
+
+# Tables created before ticket_id was a string column are converted in place
+ROLLUP_UPGRADES = [
+    f"ALTER TABLE sales_by_ticket MODIFY COLUMN ticket_id {TICKET_ID_TYPE} NOT NULL",
+]
+
+# Regenerate each rollup from the raw transactions/transaction_items rows
+REBUILD_QUERIES = [
+    """
+    INSERT INTO sales_by_day (day, transaction_count, total_sales, total_tax, total_discount)
+    SELECT DATE(created_at), COUNT(*), COALESCE(SUM(total_amount), 0),
+           COALESCE(SUM(tax_amount), 0), COALESCE(SUM(discount_amount), 0)
+    FROM transactions
+    GROUP BY DATE(created_at)
+    """,
+    """
+    INSERT INTO sales_by_hour (day, hour, transaction_count, total_sales)
+    SELECT DATE(created_at), HOUR(created_at), COUNT(*), COALESCE(SUM(total_amount), 0)
+    FROM transactions
+    GROUP BY DATE(created_at), HOUR(created_at)
+    """,
+    """
+    INSERT INTO sales_by_ticket (day, ticket_id, quantity, sales)
+    SELECT DATE(created_at), CAST(ticket_id AS CHAR(50)), SUM(quantity), SUM(quantity * price_at_sale)
+    FROM transaction_items
+    GROUP BY DATE(created_at), ticket_id
+    """,
+]
+
+def ensure_rollup_tables():
+    """Create any missing rollup table (empty); called at app startup.
+
+    Sales sync fails while a table is missing, so an upgraded install gets
+    them without running this script first. Tables created this way only
+    hold sales synced from then on; run this script to backfill them.
+    """
+    with transaction(dictionary=False) as cursor:
+        for ddl in ROLLUP_TABLES.values():
+            cursor.execute(ddl)
+
+def rebuild_sales_rollups():
+    """Create the rollup tables if needed and regenerate them from the raw sales tables.
+
+    Run after a schema change or a manual fix to the sales tables. The
+    tables are emptied and refilled in one DB transaction.
+    """
+    try:
+        # DDL commits implicitly, so the tables are created before the
+        # refill transaction starts
+        with transaction(dictionary=False) as cursor:
+            for ddl in ROLLUP_TABLES.values():
+                cursor.execute(ddl)
+            for ddl in ROLLUP_UPGRADES:
+                cursor.execute(ddl)
+        with transaction(dictionary=False) as cursor:
+            for table in ROLLUP_TABLES:
+                # DELETE rather than TRUNCATE, which would commit on its own
+                cursor.execute(f"DELETE FROM {table}")
+            for query in REBUILD_QUERIES:
+                cursor.execute(query)
+                print(f"Rebuilt {cursor.rowcount} rollup rows")
+        print("Rollup rebuild completed successfully!")
+    except mysql.connector.Error as err:
+        print(f"Error during rollup rebuild: {err}")
+
+if __name__ == "__main__":
+    rebuild_sales_rollups()
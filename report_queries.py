@@ -0,0 +1,135 @@
+# Sales reporting straight from MySQL.
+#
+# Sales are aggregated in the database, so only one row per day, hour,
+# ticket or cashier comes back over the network. Day, hour and ticket
+# figures read the sales_by_* rollup tables that sales.save_sale() keeps up
+# to date (rebuild_sales_rollups.py regenerates them), so their cost does
+# not grow with sales history. Per-cashier figures group the transactions
+# table; that query filters on a half-open created_at range
+# ([start_date, end_date + 1 day)) so the indexes added by
+# migrate_reporting_indexes.py can be used.
+#
+# The database only holds sales that have been synced, so figures can lag
+# the local journal (see sync_queue.pending_count()).
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from db_config import execute_query, iter_query
+
+
+def _date_range(start_date, end_date=None):
+    """Return (start, end) datetimes covering start_date..end_date inclusive."""
+    end_date = end_date or start_date
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+    return start, end
+
+
+def _rows(query, params):
+    # Decimal sums come back as floats and dates as YYYY-MM-DD strings, like
+    # the rest of the reporting code
+    rows = execute_query(query, params, fetch=True) or []
+    for row in rows:
+        for key, value in row.items():
+            if isinstance(value, Decimal):
+                row[key] = float(value)
+            elif isinstance(value, date):
+                row[key] = value.strftime("%Y-%m-%d")
+    return rows
+
+
+def sales_by_day(start_date, end_date=None):
+    """Totals per day, oldest first, from the sales_by_day rollup.
+
+    Rows: day (YYYY-MM-DD), transaction_count, total_sales, total_tax,
+    total_discount.
+    """
+    query = """
+        SELECT day, transaction_count, total_sales, total_tax, total_discount
+        FROM sales_by_day
+        WHERE day >= %s AND day < %s
+        ORDER BY day
+    """
+    return _rows(query, _date_range(start_date, end_date))
+
+
+def sales_by_hour(start_date, end_date=None):
+    """Totals per hour of the day (0-23) across the range, from the sales_by_hour rollup.
+
+    Rows: hour, transaction_count, total_sales. Hours with no sales are
+    left out.
+    """
+    query = """
+        SELECT hour,
+               SUM(transaction_count) AS transaction_count,
+               SUM(total_sales) AS total_sales
+        FROM sales_by_hour
+        WHERE day >= %s AND day < %s
+        GROUP BY hour
+        ORDER BY hour
+    """
+    return _rows(query, _date_range(start_date, end_date))
+
+
+def sales_by_ticket(start_date, end_date=None):
+    """Quantity and revenue per event/tier, best sellers first, from the sales_by_ticket rollup.
+
+    Rows: ticket_id, event, tier, quantity, sales (event and tier are None
+    for tickets deleted since, whose sales still count).
+    """
+    query = """
+        SELECT r.ticket_id, t.event, t.tier, r.quantity, r.sales
+        FROM (
+            SELECT ticket_id, SUM(quantity) AS quantity, SUM(sales) AS sales
+            FROM sales_by_ticket
+            WHERE day >= %s AND day < %s
+            GROUP BY ticket_id
+        ) r
+        LEFT JOIN tickets t ON t.ticket_id = r.ticket_id
+        ORDER BY r.sales DESC
+    """
+    return _rows(query, _date_range(start_date, end_date))
+
+
+def sales_by_cashier(start_date, end_date=None):
+    """Totals per cashier, highest sales first.
+
+    Rows: user_id, username (None for sales without a known cashier),
+    transaction_count, total_sales.
+    """
+    query = """
+        SELECT s.user_id, u.username, s.transaction_count, s.total_sales
+        FROM (
+            SELECT user_id,
+                   COUNT(*) AS transaction_count,
+                   COALESCE(SUM(total_amount), 0) AS total_sales
+            FROM transactions
+            WHERE created_at >= %s AND created_at < %s
+            GROUP BY user_id
+        ) s
+        LEFT JOIN users u ON u.id = s.user_id
+        ORDER BY s.total_sales DESC
+    """
+    return _rows(query, _date_range(start_date, end_date))
+
+
+def iter_sale_items(start_date, end_date=None, row_type='dict'):
+    """Stream every sold line item in the range, oldest first, for exports.
+
+    Rows (see db_config.iter_query for row_type): transaction_id,
+    created_at, ticket_id, event, tier, quantity, price_at_sale. Values are
+    passed through as MySQL returns them (datetimes and Decimals); event and
+    tier are None for tickets deleted since.
+    """
+    query = """
+        SELECT t.transaction_id, ti.created_at, ti.ticket_id, tk.event, tk.tier,
+               ti.quantity, ti.price_at_sale
+        FROM transaction_items ti
+        JOIN transactions t ON t.id = ti.transaction_id
+        LEFT JOIN tickets tk ON tk.ticket_id = ti.ticket_id
+        WHERE ti.created_at >= %s AND ti.created_at < %s
+        ORDER BY ti.created_at
+    """
+    return iter_query(query, _date_range(start_date, end_date), row_type=row_type)
@@ -0,0 +1,188 @@
+# Transaction report aggregation.
+#
+# Builds the data behind the report screen from the day's transaction files.
+# Nothing here touches Kivy, so reports can be computed on a worker thread
+# and handed back to the UI with Clock.schedule_once.
+
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+import json
+import os
+import subprocess
+import sys
+import journal
+import summary_index
+
+# Ranges with fewer stale days than this are scanned in-process; starting
+# worker processes costs more than parsing a handful of files.
+#
+# Larger ranges are split across worker processes that run this file as a
+# script (see the bottom of the file). XML parsing holds the GIL, so threads
+# would not help, and a multiprocessing pool does not fit here: reports run
+# on a worker thread of the Kivy app, where forking can deadlock on locks
+# held by other threads, and spawn/forkserver children re-import main.py
+# (which imports kivy.core.window). This file imports neither.
+PARALLEL_MIN_DAYS = 4
+
+
+def _parse_amount(elem, path):
+    text = elem.findtext(path)
+    return float(text) if text else 0.0
+
+
+def summarize_day(date_str):
+    """Aggregate one day's transactions into a report.
+
+    Transactions are streamed from the journal files one at a time, so only
+    the per-transaction rows are kept, never the parsed XML. Returns
+    {"summary": {...}, "transactions": [...]}, or {"error": message}.
+    """
+    transactions = []
+    summary = {
+        "total_sales": 0.0,
+        "total_tax": 0.0,
+        "total_discount": 0.0,
+        "transaction_count": 0
+    }
+
+    if not journal.day_exists(date_str):
+        filename = journal.get_daily_filename(date_str)
+        return {"error": f"No transactions found for {date_str} (File not found: {filename})"}
+
+    try:
+        for trans_elem in journal.iter_transactions(date_str):
+            try:
+                total = _parse_amount(trans_elem, "Summary/Total")
+                tax = _parse_amount(trans_elem, "Summary/TaxAmount")
+                discount = _parse_amount(trans_elem, "Summary/DiscountAmount")
+
+                transactions.append({
+                    "id": trans_elem.findtext("TransactionID", "N/A"),
+                    "timestamp": trans_elem.findtext("Timestamp", "N/A"),
+                    "total": total,
+                    "tax": tax,
+                    "discount": discount
+                })
+                summary["total_sales"] += total
+                summary["total_tax"] += tax
+                summary["total_discount"] += discount # Assuming discount is stored as positive
+                summary["transaction_count"] += 1
+            except (ValueError, AttributeError) as e:
+                print(f"Warning: Skipping a transaction for {date_str} due to parsing error: {e}")
+                transactions.append({
+                    "id": "PARSE_ERROR",
+                    "timestamp": "N/A",
+                    "total": 0.0,
+                    "error_details": str(e)
+                })
+    except ET.ParseError:
+        return {"error": f"Error parsing XML file: {journal.get_daily_filename(date_str)}"}
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred while processing transactions for {date_str}: {str(e)}"}
+
+    return {"summary": summary, "transactions": transactions}
+
+
+def _day_totals(date_str):
+    """Totals for one day from its summary sidecar, rebuilding it if stale.
+
+    Runs in a worker process when a range has many stale days.
+    """
+    totals = {
+        "date": date_str,
+        "total_sales": 0.0,
+        "total_tax": 0.0,
+        "total_discount": 0.0,
+        "transaction_count": 0,
+        "error": None
+    }
+    try:
+        summary = summary_index.get_day_summary(date_str)
+        if summary:
+            for key in ("total_sales", "total_tax", "total_discount", "transaction_count"):
+                totals[key] = summary[key]
+    except ET.ParseError:
+        totals["error"] = f"Error parsing XML file: {journal.get_daily_filename(date_str)}"
+    except Exception as e:
+        totals["error"] = f"{date_str}: {e}"
+    return totals
+
+
+def dates_between(start_date, end_date):
+    """Return every YYYY-MM-DD date from start_date to end_date inclusive."""
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    return [(start + timedelta(days=n)).strftime("%Y-%m-%d") for n in range((end - start).days + 1)]
+
+
+def _scan_in_workers(days):
+    """Re-sum days in parallel worker processes; returns {date: totals}.
+
+    Days whose worker failed are left out for the caller to sum itself.
+    """
+    workers = min(len(days), os.cpu_count() or 1)
+    processes = []
+    for chunk in (days[n::workers] for n in range(workers)):
+        try:
+            process = subprocess.Popen([sys.executable, os.path.abspath(__file__)] + chunk,
+                                       stdout=subprocess.PIPE, text=True)
+        except OSError as e:
+            print(f"[REPORTS] Could not start a report worker: {e}")
+            continue
+        processes.append((chunk, process))
+
+    totals_by_day = {}
+    for chunk, process in processes:
+        output, _ = process.communicate()
+        try:
+            # The result is the last line; summary warnings may precede it
+            totals_by_day.update(zip(chunk, json.loads(output.strip().splitlines()[-1])))
+        except (ValueError, IndexError):
+            print(f"[REPORTS] Report worker for {chunk[0]}.. failed (exit code {process.returncode})")
+    return totals_by_day
+
+
+def summarize_range(start_date, end_date):
+    """Aggregate every day from start_date to end_date (inclusive).
+
+    Days are read from their summary sidecars. Days whose sidecar is stale
+    are re-summed from their files, in worker processes when there are
+    enough of them, and the partial sums merged. Returns
+    {"summary": {...}, "days": [per-day totals, oldest first],
+    "errors": [messages]}, or {"error": message}.
+    """
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    days = [day for day in dates_between(start_date, end_date) if journal.day_exists(day)]
+    if not days:
+        return {"error": f"No transactions found between {start_date} and {end_date}"}
+
+    stale_days = [day for day in days if not summary_index.is_fresh(day)]
+    if len(stale_days) < PARALLEL_MIN_DAYS or getattr(sys, "frozen", False):
+        totals_by_day = {}  # A frozen build has no interpreter to run this file with
+    else:
+        totals_by_day = _scan_in_workers(stale_days)
+    # Days a worker could not return are summed here
+    day_totals = [totals_by_day.get(day) or _day_totals(day) for day in days]
+
+    summary = {
+        "total_sales": 0.0,
+        "total_tax": 0.0,
+        "total_discount": 0.0,
+        "transaction_count": 0
+    }
+    errors = []
+    for totals in day_totals:
+        if totals["error"]:
+            errors.append(totals["error"])
+        for key in summary:
+            summary[key] += totals[key]
+    return {"summary": summary, "days": day_totals, "errors": errors}
+
+
+if __name__ == "__main__":
+    # Worker process for summarize_range: re-sum the given days (refreshing
+    # their summary sidecars) and print their totals as one JSON list
+    print(json.dumps([_day_totals(date_str) for date_str in sys.argv[1:]]))
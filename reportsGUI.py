@@ -8,6 +8,7 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.scrollview import ScrollView
 from kivy.metrics import dp, sp
 from kivy.graphics import Color, Rectangle, RoundedRectangle, Line
+from kivy.clock import Clock
 from adminNav import NavBar # Assuming NavBar is in adminNav.py
 from userNav import UserNavBar
 import xml.etree.ElementTree as ET
@@ -15,6 +16,8 @@ import os
 from datetime import datetime, timedelta
 from kivy.uix.anchorlayout import AnchorLayout
 import auth
+import reports
+import threading
 
 ACCENT_BLUE = (0.22, 0.27, 0.74, 1)
 WHITE = (1, 1, 1, 1)
@@ -33,6 +36,7 @@ class ReportScreen(Screen):
 
         self.layout = BoxLayout(orientation='vertical')
         self.navbar = None
+        self._report_request = 0  # Bumped per Generate Report click
 
         content_area = BoxLayout(orientation='vertical', padding=dp(32), spacing=dp(16), size_hint_y=1)
         self.content_area = content_area
@@ -48,7 +52,7 @@ class ReportScreen(Screen):
         content_area.add_widget(title_layout)
 
         # Date Input and Generate Button in a white container
-        input_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(100), padding=[dp(32), dp(24), dp(32), dp(24)])
+        input_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(150), padding=[dp(32), dp(24), dp(32), dp(24)], spacing=dp(10))
         with input_container.canvas.before:
             Color(*WHITE)
             input_container.bg_rect = RoundedRectangle(size=input_container.size, pos=input_container.pos, radius=[(dp(10), dp(10))] * 4)
@@ -61,7 +65,7 @@ class ReportScreen(Screen):
         input_bar.add_widget(input_label)
         # Expanding TextInput
         self.date_input = TextInput(
-            hint_text=datetime.now().strftime("%Y-%m-%d"),
+            hint_text=f"{datetime.now().strftime('%Y-%m-%d')}  or  YYYY-MM-DD to YYYY-MM-DD",
             multiline=False,
             size_hint_x=1,
             width=0,
@@ -86,6 +90,35 @@ class ReportScreen(Screen):
         # Center all vertically
         input_bar.padding = [0, (dp(56)-dp(40))//2, 0, (dp(56)-dp(40))//2]
         input_container.add_widget(input_bar)
+
+        # Quick date ranges for multi-day reports
+        range_bar = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(12))
+        range_label = Label(text='Quick ranges:', color=(0, 0, 0, 0.6), font_size=sp(14), size_hint_x=None, width=dp(120), halign='left', valign='middle')
+        range_label.bind(size=lambda instance, value: setattr(instance, 'text_size', (instance.width, instance.height)))
+        range_bar.add_widget(range_label)
+        for text, days_back in (('Last 7 Days', 6), ('Last 30 Days', 29), ('Last 90 Days', 89)):
+            range_btn = Button(
+                text=text,
+                size_hint_x=None,
+                width=dp(140),
+                background_normal='',
+                background_color=(0.22, 0.27, 0.74, 0.7),
+                color=WHITE
+            )
+            range_btn.bind(on_release=lambda instance, n=days_back: self.set_quick_range(days_back=n))
+            range_bar.add_widget(range_btn)
+        month_btn = Button(
+            text='This Month',
+            size_hint_x=None,
+            width=dp(140),
+            background_normal='',
+            background_color=(0.22, 0.27, 0.74, 0.7),
+            color=WHITE
+        )
+        month_btn.bind(on_release=lambda instance: self.set_quick_range(month=True))
+        range_bar.add_widget(month_btn)
+        range_bar.add_widget(BoxLayout())  # Spacer
+        input_container.add_widget(range_bar)
         content_area.add_widget(input_container)
 
         # Report Display Area in a white container
@@ -119,83 +152,55 @@ class ReportScreen(Screen):
         instance.bg_rect.size = instance.size
         instance.bg_rect.pos = instance.pos
 
-    def generate_report_for_date(self, instance):
-        date_str = self.date_input.text.strip()
-        if not date_str:
-            date_str = datetime.now().strftime("%Y-%m-%d")
+    def set_quick_range(self, days_back=0, month=False):
+        end = datetime.now()
+        start = end.replace(day=1) if month else end - timedelta(days=days_back)
+        self.date_input.text = f"{start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}"
+        self.generate_report_for_date(None)
 
+    def generate_report_for_date(self, instance):
+        date_text = self.date_input.text.strip()
+        if not date_text:
+            date_text = datetime.now().strftime("%Y-%m-%d")
+
+        # Either a single date or "start to end"
+        dates = [part.strip() for part in date_text.split(" to ")]
+        if len(dates) > 2:
+            self.display_error("Invalid date range. Please use YYYY-MM-DD to YYYY-MM-DD.")
+            return
         try:
-            datetime.strptime(date_str, "%Y-%m-%d")
+            for date_str in dates:
+                datetime.strptime(date_str, "%Y-%m-%d")
         except ValueError:
             self.display_error("Invalid date format. Please use YYYY-MM-DD.")
             return
 
-        report_data = self.fetch_transaction_data_for_day(date_str)
-        self.display_daily_report(report_data, date_str)
-
-    def fetch_transaction_data_for_day(self, date_str):
-        # Ensure transactions folder exists
-        transactions_dir = "transactions"
-        if not os.path.exists(transactions_dir):
-            os.makedirs(transactions_dir)
-        filename = os.path.join(transactions_dir, f"transactions_{date_str}.xml")
-        transactions = []
-        summary = {
-            "total_sales": 0.0,
-            "total_tax": 0.0,
-            "total_discount": 0.0,
-            "transaction_count": 0
-        }
-
-        if not os.path.exists(filename):
-            return {"error": f"No transactions found for {date_str} (File not found: {filename})"}
-
-        try:
-            tree = ET.parse(filename)
-            daily_root = tree.getroot()
+        # Parse off the UI thread; only the latest request gets displayed
+        self._report_request += 1
+        request_id = self._report_request
+        self.display_loading(date_text)
+        threading.Thread(
+            target=self._fetch_report,
+            args=(request_id, dates),
+            daemon=True
+        ).start()
+
+    def _fetch_report(self, request_id, dates):
+        if len(dates) == 1:
+            report_data = self.fetch_transaction_data_for_day(dates[0])
+            display = lambda: self.display_daily_report(report_data, dates[0])
+        else:
+            report_data = reports.summarize_range(dates[0], dates[1])
+            display = lambda: self.display_range_report(report_data, dates[0], dates[1])
+        Clock.schedule_once(lambda dt: self._on_report_ready(request_id, display))
 
-            if daily_root.tag != "DailyTransactions":
-                return {"error": f"Invalid XML format in {filename}. Expected root tag 'DailyTransactions'."}
+    def _on_report_ready(self, request_id, display):
+        if request_id != self._report_request:
+            return  # A newer report was requested while this one was parsing
+        display()
 
-            for trans_elem in daily_root.findall("Transaction"):
-                try:
-                    tid = trans_elem.findtext("TransactionID", "N/A")
-                    timestamp = trans_elem.findtext("Timestamp", "N/A")
-                    total_text = trans_elem.find("Summary/Total")
-                    tax_text = trans_elem.find("Summary/TaxAmount")
-                    discount_text = trans_elem.find("Summary/DiscountAmount")
-
-                    total = float(total_text.text) if total_text is not None and total_text.text else 0.0
-                    tax = float(tax_text.text) if tax_text is not None and tax_text.text else 0.0
-                    discount = float(discount_text.text) if discount_text is not None and discount_text.text else 0.0
-                    
-                    transactions.append({
-                        "id": tid,
-                        "timestamp": timestamp,
-                        "total": total,
-                        "tax": tax,
-                        "discount": discount
-                    })
-                    summary["total_sales"] += total
-                    summary["total_tax"] += tax
-                    summary["total_discount"] += discount # Assuming discount is stored as positive
-                    summary["transaction_count"] += 1
-                except (ValueError, AttributeError) as e:
-                    print(f"Warning: Skipping a transaction in {filename} due to parsing error: {e}")
-                    transactions.append({
-                        "id": "PARSE_ERROR",
-                        "timestamp": "N/A",
-                        "total": 0.0,
-                        "error_details": str(e)
-                    })
-
-
-        except ET.ParseError:
-            return {"error": f"Error parsing XML file: {filename}"}
-        except Exception as e:
-            return {"error": f"An unexpected error occurred while processing {filename}: {str(e)}"}
-
-        return {"summary": summary, "transactions": transactions}
+    def fetch_transaction_data_for_day(self, date_str):
+        return reports.summarize_day(date_str)
 
     def display_daily_report(self, report_data, date_str):
         self.report_display_layout.clear_widgets()
@@ -262,6 +267,86 @@ class ReportScreen(Screen):
 
         self.report_display_layout.add_widget(card)
 
+    def display_range_report(self, report_data, start_date, end_date):
+        self.report_display_layout.clear_widgets()
+
+        if report_data.get("error"):
+            self.display_error(report_data["error"])
+            return
+
+        summary = report_data["summary"]
+        card = BoxLayout(orientation='vertical', size_hint=(1, 1), padding=dp(15), spacing=dp(5))
+        with card.canvas.before:
+            Color(*WHITE)
+            card.bg_rect = RoundedRectangle(size=card.size, pos=card.pos, radius=[(dp(18), dp(18))] * 4)
+        card.bind(size=lambda instance, value: setattr(instance.bg_rect, 'size', instance.size))
+        card.bind(pos=lambda instance, value: setattr(instance.bg_rect, 'pos', instance.pos))
+
+        range_header = Label(
+            text=f"Sales from {min(start_date, end_date)} to {max(start_date, end_date)}",
+            font_size=sp(18), bold=True, color=BLACK,
+            size_hint_y=None, height=dp(40), halign='center', valign='top'
+        )
+        range_header.bind(size=lambda instance, value: setattr(instance, 'text_size', (instance.width, None)))
+        card.add_widget(range_header)
+
+        totals_label = Label(
+            text=(f"{summary['transaction_count']:,} transactions   |   "
+                  f"Sales ₱{summary['total_sales']:,.2f}   |   "
+                  f"Tax ₱{summary['total_tax']:,.2f}   |   "
+                  f"Discounts ₱{summary['total_discount']:,.2f}"),
+            font_size=sp(14), color=ACCENT_BLUE,
+            size_hint_y=None, height=dp(30), halign='center', valign='middle'
+        )
+        totals_label.bind(size=lambda instance, value: setattr(instance, 'text_size', (instance.width, None)))
+        card.add_widget(totals_label)
+
+        for error in report_data.get("errors", []):
+            error_label = Label(text=f"Skipped: {error}", color=(0.8, 0, 0, 1), font_size=sp(12), size_hint_y=None, height=dp(20))
+            card.add_widget(error_label)
+
+        # One row per day in the range that has transactions
+        days_grid = GridLayout(cols=4, size_hint_y=None, spacing=dp(0), padding=[0, 0, 0, 0])
+        days_grid.bind(minimum_height=days_grid.setter('height'))
+
+        for header in ["Date", "Transactions", "Total", "Tax"]:
+            header_cell = BoxLayout(size_hint_y=None, height=dp(40), padding=[dp(8),0,dp(8),0])
+            header_label = Label(text=header, color=ACCENT_BLUE, bold=True, halign='center', valign='middle')
+            header_label.bind(size=lambda instance, value: setattr(instance, 'text_size', instance.size))
+            header_cell.add_widget(header_label)
+            days_grid.add_widget(header_cell)
+
+        for idx, day in enumerate(report_data["days"]):
+            row_color = WHITE if idx % 2 == 0 else ROW_ALT_BLUE
+            cells = [
+                day['date'],
+                f"{day['transaction_count']:,}",
+                f"₱{day['total_sales']:,.2f}",
+                f"₱{day['total_tax']:,.2f}"
+            ]
+            for cell_text in cells:
+                cell = BoxLayout(size_hint_y=None, height=dp(40), padding=[dp(8),0,dp(8),0])
+                with cell.canvas.before:
+                    Color(*row_color)
+                    cell.bg_rect = Rectangle(pos=cell.pos, size=cell.size)
+                cell.bind(pos=lambda instance, *args: setattr(instance.bg_rect, 'pos', instance.pos))
+                cell.bind(size=lambda instance, *args: setattr(instance.bg_rect, 'size', instance.size))
+                label = Label(text=cell_text, color=BLACK, halign='center', valign='middle')
+                label.bind(size=lambda instance, value: setattr(instance, 'text_size', instance.size))
+                cell.add_widget(label)
+                days_grid.add_widget(cell)
+
+        scroll = ScrollView(size_hint=(1, 1), bar_width=dp(8))
+        scroll.add_widget(days_grid)
+        card.add_widget(scroll)
+
+        self.report_display_layout.add_widget(card)
+
+    def display_loading(self, date_str):
+        self.report_display_layout.clear_widgets()
+        loading_label = Label(text=f"Loading report for {date_str}...", color=(0, 0, 0, 0.6), font_size=sp(16), size_hint_y=None, height=dp(50), halign='center')
+        self.report_display_layout.add_widget(loading_label)
+
     def display_error(self, message):
         self.report_display_layout.clear_widgets()
         error_container = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(100), padding=dp(15))
@@ -0,0 +1,164 @@
+# Database persistence for completed sales.
+#
+# A sale is described by a plain dict ("transaction record") built on the UI
+# thread at checkout, so it can be saved later from the sync worker without
+# touching any Kivy widgets.
+
+from db_config import get_db_connection, close_db_connection, run_prepared, transaction
+from tickets import reserve_stock, get_ticket_id
+from auth import get_user_id
+import traceback
+
+
+class SaleDataError(Exception):
+    """Raised when a sale record can never be saved (e.g. an unknown ticket)."""
+    pass
+
+
+# Statements run for every sale; they stay prepared on each pooled connection
+# (see db_config.USE_PREPARED_STATEMENTS)
+#
+# A queued sale can be replayed after it was committed (the app stopped, or
+# the OK packet was lost, before its spool file was removed), so the insert
+# is skipped when the same transaction ID and timestamp are already stored.
+# migrate_transaction_dedup.py adds the matching unique key.
+TRANSACTION_INSERT = """
+    INSERT INTO transactions
+    (transaction_id, user_id, total_amount, tax_amount, discount_amount, created_at)
+    SELECT %s, %s, %s, %s, %s, %s FROM DUAL
+    WHERE NOT EXISTS (
+        SELECT 1 FROM transactions WHERE transaction_id = %s AND created_at = %s
+    )
+"""
+# Line items and per-ticket rollups go as one multi-row statement per sale
+TRANSACTION_ITEMS_INSERT = """
+    INSERT INTO transaction_items
+    (transaction_id, ticket_id, quantity, price_at_sale, created_at)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+SALES_BY_TICKET_UPSERT = """
+    INSERT INTO sales_by_ticket (day, ticket_id, quantity, sales)
+    VALUES (DATE(%s), %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    quantity = quantity + VALUES(quantity),
+    sales = sales + VALUES(sales)
+"""
+SALES_BY_DAY_UPSERT = """
+    INSERT INTO sales_by_day (day, transaction_count, total_sales, total_tax, total_discount)
+    VALUES (DATE(%s), 1, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    transaction_count = transaction_count + 1,
+    total_sales = total_sales + VALUES(total_sales),
+    total_tax = total_tax + VALUES(total_tax),
+    total_discount = total_discount + VALUES(total_discount)
+"""
+SALES_BY_HOUR_UPSERT = """
+    INSERT INTO sales_by_hour (day, hour, transaction_count, total_sales)
+    VALUES (DATE(%s), HOUR(%s), 1, %s)
+    ON DUPLICATE KEY UPDATE
+    transaction_count = transaction_count + 1,
+    total_sales = total_sales + VALUES(total_sales)
+"""
+
+
+def save_sale(record, connection=None):
+    """Insert a sale and its line items into the database in one DB transaction.
+
+    If a connection is given it is reused (and left open) so a batch of sales
+    can share it; otherwise one is taken from the pool for this call.
+    Returns False, without writing anything, if the sale was already saved.
+    """
+    print(f"[DB SAVE] Starting transaction save for ID: {record['transaction_id']}")
+
+    # The cashier's user ID is resolved once at login and carried on the record;
+    # only sales queued before that existed still need a lookup
+    user_id = record.get('user_id')
+    if user_id is None and record.get('username'):
+        user_id = get_user_id(record['username'])
+
+    # Ticket IDs come from the cached catalog, not a per-sale table scan
+    item_values = []
+    for item in record['items']:
+        ticket_id = item.get('ticket_id') or get_ticket_id(item['event'], item['tier'])
+        if ticket_id is None:
+            raise SaleDataError(f"Ticket not found in database: {item['event']} - {item['tier']}")
+        item_values.append((
+            ticket_id,
+            item['quantity'],
+            float(item['price'])
+        ))
+    print(f"[DB SAVE] Prepared {len(item_values)} items for insertion")
+
+    owns_connection = connection is None
+    try:
+        if owns_connection:
+            connection = get_db_connection()
+        with transaction(connection) as cursor:
+            # Insert transaction
+            transaction_params = (
+                record['transaction_id'],
+                user_id,
+                float(record['total']),
+                float(record['tax']),
+                float(record['discount_amount']),
+                record['timestamp'],
+                record['transaction_id'],
+                record['timestamp']
+            )
+            inserted = run_prepared(connection, TRANSACTION_INSERT, transaction_params)
+            if not inserted.rowcount:
+                print(f"[DB SAVE] Transaction {record['transaction_id']} was already saved, skipping")
+                return False
+            transaction_db_id = inserted.lastrowid
+            print(f"[DB SAVE] Inserted transaction with ID: {transaction_db_id}")
+
+            # Insert all transaction items with one multi-row INSERT (one
+            # round trip, which beats executing a prepared statement per row)
+            if item_values:
+                cursor.executemany(TRANSACTION_ITEMS_INSERT, [(transaction_db_id,) + item + (record['timestamp'],) for item in item_values])
+                print(f"[DB SAVE] Inserted {len(item_values)} transaction items")
+
+            # Roll the sale into the reporting tables in the same DB transaction
+            _update_rollups(connection, cursor, record, item_values)
+    except Exception:
+        print("[DB SAVE] Transaction rolled back due to error")
+        raise
+    finally:
+        if owns_connection and connection:
+            close_db_connection(connection)
+    print("[DB SAVE] Transaction committed successfully")
+    return True
+
+
+def _update_rollups(connection, cursor, record, item_values):
+    """Add one sale to the sales_by_day/hour/ticket rollup tables.
+
+    See rebuild_sales_rollups.py for the table definitions and for
+    regenerating them from the raw tables.
+    """
+    timestamp = record['timestamp']
+    total = float(record['total'])
+    run_prepared(connection, SALES_BY_DAY_UPSERT,
+                 (timestamp, total, float(record['tax']), float(record['discount_amount'])))
+    run_prepared(connection, SALES_BY_HOUR_UPSERT, (timestamp, timestamp, total))
+    if item_values:
+        cursor.executemany(SALES_BY_TICKET_UPSERT, [(timestamp, ticket_id, quantity, quantity * price) for ticket_id, quantity, price in item_values])
+
+
+def sync_sale(record, connection=None):
+    """Persist a queued sale: save it, then apply any stock changes still owed.
+
+    Stock is normally reserved at checkout; only sales completed while the
+    database was unreachable still need their availability decremented here.
+    A replayed sale that was already saved is skipped, stock included.
+    """
+    if not save_sale(record, connection):
+        return
+    if record.get('stock_reserved'):
+        return
+    try:
+        reserve_stock(record['items'], force=True)
+    except Exception as e:
+        # The sale itself is saved; a failed stock update must not re-queue it
+        print(f"ERROR updating stock availability: {e}")
+        traceback.print_exc()
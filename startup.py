@@ -0,0 +1,84 @@
+# Background database bootstrap.
+#
+# Creating the connection pool and checking for the default admin account
+# can take tens of seconds when the MySQL host is slow or unreachable
+# (connect timeouts plus retries). Both now run on a worker thread started
+# from POSitApp.build(), so the window draws straight away; screens that
+# need the database (the login screen) watch the readiness state below.
+
+import threading
+
+import auth
+import db_config
+import rebuild_sales_rollups
+
+CONNECTING = "connecting"
+READY = "ready"
+FAILED = "failed"
+
+_state = CONNECTING
+_error = None
+_listeners = []
+_worker = None
+_lock = threading.Lock()
+
+
+def get_state():
+    """Return (state, error message or None)."""
+    return _state, _error
+
+
+def is_ready():
+    return _state == READY
+
+
+def add_listener(callback):
+    """Register callback(state, error), called from the startup thread."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def _set_state(state, error=None):
+    global _state, _error
+    _state, _error = state, error
+    for callback in list(_listeners):
+        try:
+            callback(state, error)
+        except Exception as e:
+            print(f"[STARTUP] Listener error: {e}")
+
+
+def _run():
+    try:
+        db_config.ensure_connection_pool(retry_failed=True)
+        # Also proves the database answers queries, pool or no pool
+        auth.init_default_users()
+    except Exception as e:
+        print(f"[STARTUP] Database not available: {e}")
+        _set_state(FAILED, str(e))
+        return
+    try:
+        # Sales sync writes to the rollup tables; create them on upgraded installs
+        rebuild_sales_rollups.ensure_rollup_tables()
+    except Exception as e:
+        # Not fatal: queued sales stay queued and are retried until it works
+        print(f"[STARTUP] Could not create the sales rollup tables: {e}")
+    _set_state(READY)
+
+
+def start():
+    """Start the bootstrap if it is not running or already done.
+
+    Calling this again after a failure retries the connection.
+    """
+    global _worker
+    with _lock:
+        if _state == READY or (_worker and _worker.is_alive()):
+            return
+        _set_state(CONNECTING)
+        _worker = threading.Thread(target=_run, name="db-startup", daemon=True)
+        _worker.start()
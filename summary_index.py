@@ -0,0 +1,164 @@
+# Pre-aggregated daily sales summaries.
+#
+# Next to each day's transaction files sits transactions/summary_<date>.json
+# holding the day's totals, an hourly histogram and per event/tier sums. It
+# is updated as each checkout is journaled, and stamped with the size and
+# mtime of the files it was computed from; if those no longer match (the
+# journal was compacted, or a file was edited by hand) it is rebuilt from the
+# transaction files the next time it is read.
+
+import json
+import os
+import threading
+import journal
+
+_lock = threading.Lock()  # Guards _day_locks
+_day_locks = {}  # date -> lock held while that day's summary is read or written
+
+
+def _day_lock(date_str):
+    # One lock per day, so days can be rebuilt on several threads at once
+    with _lock:
+        return _day_locks.setdefault(date_str, threading.Lock())
+
+
+def get_summary_filename(date_str):
+    """Path of the summary sidecar for a day."""
+    return os.path.join(journal.TRANSACTIONS_DIR, f"summary_{date_str}.json")
+
+
+def source_stats(date_str):
+    """Return the (size, mtime_ns) of a day's XML and journal files (None if absent)."""
+    stats = {}
+    for kind, filename in (("xml", journal.get_daily_filename(date_str)),
+                           ("journal", journal.get_journal_filename(date_str))):
+        try:
+            st = os.stat(filename)
+            stats[kind] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            stats[kind] = None
+    return stats
+
+
+def _empty_summary(date_str):
+    return {
+        "date": date_str,
+        "total_sales": 0.0,
+        "total_tax": 0.0,
+        "total_discount": 0.0,
+        "transaction_count": 0,
+        "hourly_counts": [0] * 24,
+        "hourly_sales": [0.0] * 24,
+        "by_ticket": {},  # "event|tier" -> {"event", "tier", "quantity", "sales"}
+        "sources": None
+    }
+
+
+def _parse_amount(elem, path):
+    text = elem.findtext(path)
+    return float(text) if text else 0.0
+
+
+def _add_transaction(summary, trans_elem):
+    """Fold one <Transaction> element into a summary."""
+    total = _parse_amount(trans_elem, "Summary/Total")
+    summary["total_sales"] += total
+    summary["total_tax"] += _parse_amount(trans_elem, "Summary/TaxAmount")
+    summary["total_discount"] += _parse_amount(trans_elem, "Summary/DiscountAmount")
+    summary["transaction_count"] += 1
+
+    timestamp = trans_elem.findtext("Timestamp", "")
+    try:
+        hour = int(timestamp.split()[1].split(":")[0])
+    except (IndexError, ValueError):
+        hour = None
+    if hour is not None and 0 <= hour < 24:
+        summary["hourly_counts"][hour] += 1
+        summary["hourly_sales"][hour] += total
+
+    for item in trans_elem.iterfind("Items/Item"):
+        event = item.findtext("Event", "")
+        tier = item.findtext("Tier", "")
+        ticket = summary["by_ticket"].setdefault(
+            f"{event}|{tier}", {"event": event, "tier": tier, "quantity": 0, "sales": 0.0})
+        ticket["quantity"] += int(item.findtext("Quantity") or 0)
+        ticket["sales"] += _parse_amount(item, "ItemTotal")
+
+
+def _write_summary(summary):
+    filename = get_summary_filename(summary["date"])
+    # Per-process temp file: report workers may rebuild sidecars alongside the app
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(summary, f)
+    os.replace(tmp_filename, filename)
+
+
+def _load_fresh(date_str):
+    # The stored summary if it still matches the transaction files, else None
+    try:
+        with open(get_summary_filename(date_str), "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if summary.get("sources") != source_stats(date_str):
+        return None
+    return summary
+
+
+def _rebuild(date_str):
+    summary = _empty_summary(date_str)
+    # Stamp the files as they were before the scan: anything written to them
+    # while it runs changes their stats, so the next read rebuilds again
+    # instead of trusting a summary that may have missed it
+    summary["sources"] = source_stats(date_str)
+    for trans_elem in journal.iter_transactions(date_str):
+        try:
+            _add_transaction(summary, trans_elem)
+        except (ValueError, AttributeError) as e:
+            print(f"[SUMMARY] Warning: Skipping a transaction for {date_str}: {e}")
+    _write_summary(summary)
+    return summary
+
+
+def is_fresh(date_str):
+    """Check whether a day's stored summary is up to date with its files."""
+    return _load_fresh(date_str) is not None
+
+
+def get_day_summary(date_str):
+    """Return the summary for a day, rebuilding it if it is missing or stale.
+
+    Returns None if the day has no transaction files. Raises ET.ParseError
+    or ValueError if a rebuild hits an unreadable DailyTransactions file.
+    """
+    if not journal.day_exists(date_str):
+        return None
+    with _day_lock(date_str):
+        summary = _load_fresh(date_str)
+        if summary is None:
+            summary = _rebuild(date_str)
+        return summary
+
+
+def record_transaction(transaction_element, date_str=None):
+    """Journal a checkout and fold it into the day's summary.
+
+    Wraps journal.append_transaction(); returns the journal filename. If
+    the summary was already stale it is left for the next read to rebuild.
+    """
+    date_str = date_str or journal.today_str()
+    with _day_lock(date_str):
+        summary = _load_fresh(date_str)
+        if summary is None and not journal.day_exists(date_str):
+            summary = _empty_summary(date_str)  # First sale of the day
+        journal_filename = journal.append_transaction(transaction_element, date_str)
+        if summary is not None:
+            try:
+                _add_transaction(summary, transaction_element)
+                summary["sources"] = source_stats(date_str)
+                _write_summary(summary)
+            except Exception as e:
+                # The sale is journaled; the summary just gets rebuilt later
+                print(f"[SUMMARY] Warning: Could not update summary for {date_str}: {e}")
+        return journal_filename
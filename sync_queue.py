@@ -0,0 +1,178 @@
+# Durable write-behind queue that drains completed sales to MySQL.
+#
+# The checkout screen only has to write the sale to a local spool file; a
+# background worker thread pushes queued sales to the database in batches and
+# retries with backoff while the database is unreachable. Sales that can never
+# be saved (bad data) are moved aside to the failed directory instead of
+# blocking the queue.
+
+import json
+import os
+import threading
+
+import mysql.connector
+
+from db_config import get_db_connection, close_db_connection
+from sales import sync_sale, SaleDataError
+
+QUEUE_DIR = os.path.join("transactions", "pending_sync")
+FAILED_DIR = os.path.join("transactions", "failed_sync")
+BATCH_SIZE = 20
+MIN_RETRY_DELAY = 1  # seconds
+MAX_RETRY_DELAY = 60  # seconds
+# Errors meaning the server could not be reached, rather than a statement failing
+CONNECTION_ERRORS = (mysql.connector.OperationalError, mysql.connector.InterfaceError)
+
+_listeners = []
+_wakeup = threading.Event()
+_stop = threading.Event()
+_worker = None
+_lock = threading.Lock()
+_database_down = False
+
+
+def _ensure_dirs():
+    for directory in (QUEUE_DIR, FAILED_DIR):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+
+def _record_filename(record):
+    # Date prefix keeps the per-day transaction IDs unique and the queue in sale order
+    return f"{record['timestamp'].replace(' ', '_').replace(':', '')}_{record['transaction_id']}.json"
+
+
+def enqueue(record):
+    """Durably queue a sale record for syncing and wake the worker."""
+    _ensure_dirs()
+    filename = os.path.join(QUEUE_DIR, _record_filename(record))
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+    _notify()
+    _wakeup.set()
+    return filename
+
+
+def _pending_files():
+    if not os.path.exists(QUEUE_DIR):
+        return []
+    return sorted(name for name in os.listdir(QUEUE_DIR) if name.endswith(".json"))
+
+
+def pending_count():
+    """Number of sales that have not reached the database yet."""
+    return len(_pending_files())
+
+
+def add_listener(callback):
+    """Register callback(pending_count, synced_count), called from the worker thread."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def _notify(synced=0):
+    count = pending_count()
+    for callback in list(_listeners):
+        try:
+            callback(count, synced)
+        except Exception as e:
+            print(f"[SYNC] Listener error: {e}")
+
+
+def database_down():
+    """True while the last attempt to reach the database failed.
+
+    Checkout then completes sales offline straight away instead of waiting
+    through connect timeouts. Cleared once the worker connects again.
+    """
+    return _database_down
+
+
+def report_database_error(error):
+    """Note an error from a database call made outside the worker."""
+    global _database_down
+    if isinstance(error, CONNECTION_ERRORS):
+        _database_down = True
+
+
+def _drain_batch():
+    """Sync up to BATCH_SIZE queued sales over one connection.
+
+    Returns (processed, synced) counts. Only a record that can never be
+    saved (bad data, SaleDataError, DataError, IntegrityError) is moved to
+    FAILED_DIR. Any other error, including server-side ones such as deadlocks,
+    lock wait timeouts or a missing table, is raised so the worker backs off
+    and retries; replaying a sale that was already saved is a no-op.
+    """
+    names = _pending_files()[:BATCH_SIZE]
+    if not names:
+        return 0, 0
+    global _database_down
+    synced = 0
+    connection = get_db_connection()
+    _database_down = False
+    try:
+        for name in names:
+            path = os.path.join(QUEUE_DIR, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                sync_sale(record, connection)
+            except (SaleDataError, ValueError, KeyError, mysql.connector.DataError, mysql.connector.IntegrityError) as e:
+                # The record itself is bad; retrying will not help, so park
+                # it for manual review instead of stalling the queue
+                print(f"[SYNC] Could not sync {name}, moving to {FAILED_DIR}: {e}")
+                os.replace(path, os.path.join(FAILED_DIR, name))
+                continue
+            os.remove(path)
+            synced += 1
+    finally:
+        close_db_connection(connection)
+    return len(names), synced
+
+
+def _run():
+    retry_delay = MIN_RETRY_DELAY
+    while not _stop.is_set():
+        _wakeup.clear()
+        try:
+            processed, synced = _drain_batch()
+            retry_delay = MIN_RETRY_DELAY
+        except Exception as e:
+            report_database_error(e)
+            print(f"[SYNC] Could not reach or write to the database, retrying in {retry_delay}s: {e}")
+            _stop.wait(retry_delay)
+            retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+            continue
+        if processed:
+            _notify(synced)
+            continue  # More may be waiting
+        _wakeup.wait(MAX_RETRY_DELAY)
+
+
+def start_worker():
+    """Start the background sync worker if it is not already running."""
+    global _worker
+    with _lock:
+        if _worker and _worker.is_alive():
+            return
+        _ensure_dirs()
+        _stop.clear()
+        _worker = threading.Thread(target=_run, name="sync-queue", daemon=True)
+        _worker.start()
+
+
+def stop_worker(timeout=5):
+    """Ask the worker to stop after its current batch."""
+    _stop.set()
+    _wakeup.set()
+    if _worker:
+        _worker.join(timeout)
@@ -1,63 +1,264 @@
 #this is where tickets will be initialized and stored
 
-from db_config import execute_query
+from db_config import execute_query, execute_prepared, get_db_connection, close_db_connection, run_prepared, transaction, with_db_retry
 from functools import lru_cache
+import bisect
+import threading
 import time
 
-# Cache timeout in seconds
+# How long a catalog snapshot is trusted before its version stamp is rechecked
+VERSION_CHECK_INTERVAL = 2  # seconds
+# Plain cache timeout used when the tickets table has no updated_at column yet
 CACHE_TIMEOUT = 5
 
-# Cache for routes with timestamp
+_ROUTE_COLUMNS = "ticket_id, event, tier, price, availability, created_at"
+# Columns the inventory screen may change on an existing ticket
+_EDITABLE_COLUMNS = ('event', 'tier', 'price', 'availability')
+
+# Catalog cache. It stays valid until the table's version stamp
+# (row count + MAX(updated_at)) changes; changed rows are then fetched
+# incrementally instead of reloading the whole table.
 _routes_cache = {
     'data': None,
-    'timestamp': 0
+    'version': None,
+    'checked_at': 0,
+    'versioned': None,  # Whether tickets.updated_at exists (see migrate_ticket_versioning.py)
+    # Lookup indexes, rebuilt once per refresh
+    'by_id': {},
+    'by_event_tier': {},
+    'by_event': {},
+    'by_tier': {},
+    # Sorted filter facets and a counter bumped on every refresh, so screens
+    # can skip rebuilding their filters when nothing changed
+    'facets': ((), ()),
+    'generation': 0
 }
+_cache_lock = threading.RLock()
 
 def _is_cache_valid():
-    """Check if the cache is still valid based on timeout."""
-    return time.time() - _routes_cache['timestamp'] < CACHE_TIMEOUT
+    """Check if the cached catalog was verified recently enough to use as-is."""
+    timeout = CACHE_TIMEOUT if _routes_cache['versioned'] is False else VERSION_CHECK_INTERVAL
+    return _routes_cache['data'] is not None and \
+        time.time() - _routes_cache['checked_at'] < timeout
 
-def get_routes():
-    """Get all ticket routes from the database with caching."""
-    # Return cached data if it's still valid
-    if _routes_cache['data'] is not None and _is_cache_valid():
-        return _routes_cache['data']
-    
-    # If cache is invalid or empty, fetch fresh data
-    query = """
-        SELECT ticket_id, event, tier, price, availability, created_at 
+def _route_sort_key(ticket):
+    # Mirrors ORDER BY CAST(SUBSTRING(ticket_id, 5) AS UNSIGNED), event, tier
+    number = ticket['ticket_id'][4:]
+    return (int(number) if number.isdigit() else 0, ticket['event'], ticket['tier'])
+
+def _set_data(rows, version):
+    """Store a fresh catalog snapshot and rebuild its lookup indexes."""
+    by_id = {}
+    by_event_tier = {}
+    by_event = {}
+    by_tier = {}
+    for ticket in rows:
+        by_id[ticket['ticket_id']] = ticket
+        by_event_tier[(ticket['event'], ticket['tier'])] = ticket
+        by_event.setdefault(ticket['event'], []).append(ticket)
+        by_tier.setdefault(ticket['tier'], []).append(ticket)
+    _routes_cache['data'] = rows
+    _routes_cache['version'] = version
+    _routes_cache['by_id'] = by_id
+    _routes_cache['by_event_tier'] = by_event_tier
+    _routes_cache['by_event'] = by_event
+    _routes_cache['by_tier'] = by_tier
+    _routes_cache['facets'] = (tuple(sorted(by_tier)), tuple(sorted(by_event)))
+    _routes_cache['generation'] += 1
+
+def _fetch_version():
+    """Fetch the cheap (row_count, last_updated) version stamp of the tickets table."""
+    if _routes_cache['versioned'] is None:
+        result = execute_query("SHOW COLUMNS FROM tickets LIKE 'updated_at'", fetch=True)
+        # A whole-second stamp misses a row changed twice within one second,
+        # so only a microsecond column (see migrate_ticket_versioning.py)
+        # counts; otherwise the cache falls back to its plain timeout
+        column_type = result[0]['Type'] if result else ''
+        if isinstance(column_type, (bytes, bytearray)):
+            column_type = column_type.decode('utf-8')
+        column_type = column_type.lower()
+        _routes_cache['versioned'] = column_type == 'timestamp(6)'
+        if result and not _routes_cache['versioned']:
+            print("[TICKETS] tickets.updated_at has whole-second precision; run migrate_ticket_versioning.py")
+    if not _routes_cache['versioned']:
+        return None
+    # Runs every VERSION_CHECK_INTERVAL while screens are open
+    result = execute_prepared(
+        "SELECT COUNT(*) AS row_count, MAX(updated_at) AS last_updated FROM tickets",
+        fetch=True
+    )
+    return (result[0]['row_count'], result[0]['last_updated'])
+
+def _load_all(version):
+    query = f"""
+        SELECT {_ROUTE_COLUMNS}
         FROM tickets 
         ORDER BY CAST(SUBSTRING(ticket_id, 5) AS UNSIGNED), event, tier
     """
-    result = execute_query(query, fetch=True)
-    
-    # Update cache
-    _routes_cache['data'] = result
-    _routes_cache['timestamp'] = time.time()
-    
-    return result
+    _set_data(execute_query(query, fetch=True), version)
+
+def _load_changed(version):
+    """Merge rows changed since the cached version; False if a full reload is needed."""
+    cached_count, cached_last_updated = _routes_cache['version']
+    row_count, last_updated = version
+    if cached_last_updated is None or row_count < cached_count:
+        return False  # Rows were deleted, or nothing to anchor an incremental fetch on
+    # >= so rows touched within the same second as the last fetch are not missed
+    query = f"SELECT {_ROUTE_COLUMNS} FROM tickets WHERE updated_at >= %s"
+    changed = execute_query(query, (cached_last_updated,), fetch=True)
+    merged = dict(_routes_cache['by_id'])
+    for ticket in changed:
+        merged[ticket['ticket_id']] = ticket
+    if len(merged) != row_count:
+        return False  # A delete and an insert cancelled out in the count
+    _set_data(sorted(merged.values(), key=_route_sort_key), version)
+    return True
+
+def get_routes():
+    """Get all ticket routes, refreshing the cache only when the catalog changed."""
+    with _cache_lock:
+        if _is_cache_valid():
+            return _routes_cache['data']
+
+        version = _fetch_version()
+        if _routes_cache['data'] is None or version is None:
+            # First load, or no version stamp available: read the whole table
+            _load_all(version)
+        elif version != _routes_cache['version']:
+            if not _load_changed(version):
+                _load_all(version)
+        _routes_cache['checked_at'] = time.time()
+        return _routes_cache['data']
 
 def invalidate_cache():
-    """Invalidate the routes cache."""
-    _routes_cache['data'] = None
-    _routes_cache['timestamp'] = 0
+    """Force the next read to recheck the catalog's version stamp."""
+    with _cache_lock:
+        _routes_cache['checked_at'] = 0
 
 def get_ticket(ticket_id):
     """Get a specific ticket by ID."""
-    # First try to get from cache
-    if _routes_cache['data'] is not None and _is_cache_valid():
-        for ticket in _routes_cache['data']:
-            if ticket['ticket_id'] == ticket_id:
-                return ticket
-    
-    # If not in cache or cache invalid, query database
-    query = """
-        SELECT ticket_id, event, tier, price, availability, created_at 
-        FROM tickets 
-        WHERE ticket_id = %s
+    get_routes()  # Make sure the cache and its indexes are current
+    return _routes_cache['by_id'].get(ticket_id)
+
+def find_ticket(event, tier):
+    """Get the ticket for an (event, tier) pair."""
+    get_routes()
+    return _routes_cache['by_event_tier'].get((event, tier))
+
+def get_ticket_id(event, tier):
+    """Get the ticket_id for an (event, tier) pair from the cached catalog."""
+    ticket = find_ticket(event, tier)
+    return ticket['ticket_id'] if ticket else None
+
+def get_tickets_by_event(event):
+    """Get all tickets for an event, in catalog order."""
+    get_routes()
+    return _routes_cache['by_event'].get(event, [])
+
+def get_tickets_by_tier(tier):
+    """Get all tickets in a tier, in catalog order."""
+    get_routes()
+    return _routes_cache['by_tier'].get(tier, [])
+
+# The three readers below take refresh=False on the UI thread: they then
+# only read the cached catalog and never wait on MySQL (or on a refresh
+# holding _cache_lock); screens call get_routes() on a worker thread instead.
+
+def get_facets(refresh=True):
+    """Get the (tiers, events) present in the catalog, each sorted."""
+    if refresh:
+        get_routes()
+    return _routes_cache['facets']
+
+def get_catalog_generation(refresh=True):
+    """Get a counter that changes whenever the cached catalog is refreshed."""
+    if refresh:
+        get_routes()
+    return _routes_cache['generation']
+
+def filter_tickets(tier=None, event=None, refresh=True):
+    """Get the tickets matching an optional tier and event, in catalog order."""
+    if refresh:
+        get_routes()
+    if tier is None and event is None:
+        return _routes_cache['data'] or []
+    if tier is None:
+        return _routes_cache['by_event'].get(event, [])
+    if event is None:
+        return _routes_cache['by_tier'].get(tier, [])
+    ticket = _routes_cache['by_event_tier'].get((event, tier))
+    return [ticket] if ticket else []
+
+def _patch_cache(ticket_id, ticket=None, count_delta=0):
+    """Apply a write made by this terminal to the cached catalog in place.
+
+    ticket=None drops the row. The cached row count is shifted by count_delta
+    so the next version check only fetches what other terminals changed.
     """
-    result = execute_query(query, (ticket_id,), fetch=True)
-    return result[0] if result else None
+    with _cache_lock:
+        if _routes_cache['data'] is None:
+            return  # Nothing cached yet; the first read loads the table anyway
+        version = _routes_cache['version']
+        if version is not None:
+            _routes_cache['version'] = (version[0] + count_delta, version[1])
+        old = _routes_cache['by_id'].get(ticket_id)
+        if old is None and ticket is None:
+            return
+        # Only the one row's index entries change. Lists are replaced rather
+        # than edited, since screens read them without taking _cache_lock
+        by_id = _routes_cache['by_id']
+        by_event_tier = _routes_cache['by_event_tier']
+        if old is not None:
+            del by_id[ticket_id]
+            if by_event_tier.get((old['event'], old['tier'])) is old:
+                del by_event_tier[(old['event'], old['tier'])]
+        if ticket is not None:
+            by_id[ticket_id] = ticket
+            by_event_tier[(ticket['event'], ticket['tier'])] = ticket
+        _routes_cache['data'] = _replace_row(_routes_cache['data'], old, ticket)
+        facets_changed = False
+        for index, column in (('by_event', 'event'), ('by_tier', 'tier')):
+            groups = _routes_cache[index]
+            names = {row[column] for row in (old, ticket) if row is not None}
+            for name in names:
+                rows = _replace_row(groups.get(name, []),
+                                    old if old is not None and old[column] == name else None,
+                                    ticket if ticket is not None and ticket[column] == name else None)
+                if rows:
+                    facets_changed = facets_changed or name not in groups
+                    groups[name] = rows
+                elif name in groups:
+                    del groups[name]
+                    facets_changed = True
+        if facets_changed:
+            _routes_cache['facets'] = (tuple(sorted(_routes_cache['by_tier'])),
+                                       tuple(sorted(_routes_cache['by_event'])))
+        _routes_cache['generation'] += 1
+
+def _replace_row(rows, old, new):
+    """Return a copy of catalog-ordered rows with old swapped for new (either may be None)."""
+    if old is not None and new is not None and _route_sort_key(old) == _route_sort_key(new):
+        return [new if row is old else row for row in rows]  # Same position, no re-sort
+    rows = [row for row in rows if row is not old]
+    if new is not None:
+        bisect.insort(rows, new, key=_route_sort_key)
+    return rows
+
+@with_db_retry()
+def _write_ticket(query, params, ticket_id, reread=True):
+    """Run a single-ticket write on one connection.
+
+    Returns (rowcount, row) where row is the ticket as stored after the
+    write (read back on the same connection), or None if it does not exist.
+    """
+    with transaction() as cursor:
+        cursor.execute(query, params)
+        rowcount = cursor.rowcount
+        row = None
+        if reread:
+            cursor.execute(f"SELECT {_ROUTE_COLUMNS} FROM tickets WHERE ticket_id = %s", (ticket_id,))
+            row = cursor.fetchone()
+    return rowcount, row
 
 def add_route(ticket_data):
     """Add a new ticket route to the database."""
@@ -72,49 +273,143 @@ def add_route(ticket_data):
         ticket_data['price'],
         ticket_data['availability']
     )
-    execute_query(query, params)
-    invalidate_cache()  # Invalidate cache after modification
-
-def remove_route(ticket_index):
-    """Remove a ticket route from the database."""
-    # First get the ticket_id for the given index
-    routes = get_routes()
-    if 0 <= ticket_index < len(routes):
-        ticket_id = routes[ticket_index]['ticket_id']
-        query = "DELETE FROM tickets WHERE ticket_id = %s"
-        execute_query(query, (ticket_id,))
-        invalidate_cache()  # Invalidate cache after modification
-
-def update_route(ticket_index, ticket_data):
-    """Update an existing ticket route in the database."""
-    query = """
-        UPDATE tickets 
-        SET event = %s, tier = %s, price = %s, availability = %s
-        WHERE ticket_id = %s
+    _, row = _write_ticket(query, params, ticket_data['ticket_id'])
+    _patch_cache(ticket_data['ticket_id'], row, count_delta=1)
+    return row
+
+def update_ticket(ticket_id, ticket_data):
+    """Update a ticket's editable fields by ID.
+
+    Only the keys present in ticket_data are written. Returns the ticket as
+    saved, or None if it no longer exists.
     """
-    params = (
-        ticket_data['event'],
-        ticket_data['tier'],
-        ticket_data['price'],
-        ticket_data['availability'],
-        ticket_data['ticket_id']
-    )
-    execute_query(query, params)
-    invalidate_cache()  # Invalidate cache after modification
+    columns = [column for column in _EDITABLE_COLUMNS if column in ticket_data]
+    if not columns:
+        return get_ticket(ticket_id)
+    assignments = ", ".join(f"{column} = %s" for column in columns)
+    query = f"UPDATE tickets SET {assignments} WHERE ticket_id = %s"
+    params = [ticket_data[column] for column in columns] + [ticket_id]
+    _, row = _write_ticket(query, params, ticket_id)
+    _patch_cache(ticket_id, row)
+    return row
 
-def update_ticket_availability(ticket_index, ticket_data):
-    """Update only the availability of a ticket."""
+def delete_ticket(ticket_id):
+    """Delete a ticket by ID. Returns False if it was already gone."""
+    query = "DELETE FROM tickets WHERE ticket_id = %s"
+    rowcount, _ = _write_ticket(query, (ticket_id,), ticket_id, reread=False)
+    _patch_cache(ticket_id, None, count_delta=-1 if rowcount else 0)
+    return rowcount > 0
+
+def adjust_stock(ticket_id, delta):
+    """Add delta (which may be negative) to a ticket's availability.
+
+    The change is applied relative to the stored value, so concurrent sales
+    on other terminals are not overwritten. Returns the updated ticket, or
+    None if it does not exist; raises InsufficientStockError if the result
+    would drop below zero.
+    """
+    if delta == 0:
+        # Nothing to change; the guarded UPDATE would match no row and be
+        # mistaken for insufficient stock
+        return get_ticket(ticket_id)
     query = """
-        UPDATE tickets 
-        SET availability = %s
-        WHERE ticket_id = %s
+        UPDATE tickets
+        SET availability = availability + %s
+        WHERE ticket_id = %s AND CAST(availability AS SIGNED) + %s >= 0
     """
-    params = (
-        ticket_data['availability'],
-        ticket_data['ticket_id']
-    )
-    execute_query(query, params)
-    invalidate_cache()  # Invalidate cache after modification
+    rowcount, row = _write_ticket(query, (delta, ticket_id, delta), ticket_id)
+    _patch_cache(ticket_id, row)
+    if row is not None and not rowcount:
+        raise InsufficientStockError(f"Only {row['availability']} left for {ticket_id}.")
+    return row
+
+class InsufficientStockError(Exception):
+    """Raised when a cart asks for more tickets than are available."""
+    pass
+
+def _apply_reservation(quantities):
+    """Subtract a cart this terminal reserved from the cached availability."""
+    with _cache_lock:
+        for key, qty in quantities.items():
+            ticket = _routes_cache['by_event_tier'].get(key)
+            if ticket is None:
+                continue
+            availability = ticket['availability']
+            # Keep the column's type (availability may be stored as text)
+            reserved = type(availability)(int(availability) - qty)
+            _patch_cache(ticket['ticket_id'], dict(ticket, availability=reserved))
+
+def _reserve_stock_query(line_count, force=False):
+    """The availability UPDATE reserve_stock runs for a cart of line_count tickets.
+
+    Parameters are (event, tier, quantity) for each line.
+    """
+    cart_rows = " UNION ALL ".join(["SELECT %s AS event, %s AS tier, %s AS qty"] * line_count)
+    if force:
+        return f"""
+            UPDATE tickets t
+            JOIN ({cart_rows}) cart ON t.event = cart.event AND t.tier = cart.tier
+            SET t.availability = GREATEST(CAST(t.availability AS SIGNED) - cart.qty, 0)
+        """
+    return f"""
+            UPDATE tickets t
+            JOIN ({cart_rows}) cart ON t.event = cart.event AND t.tier = cart.tier
+            SET t.availability = t.availability - cart.qty
+            WHERE t.availability >= cart.qty
+        """
+
+def _cart_quantities(items):
+    # (event, tier) -> total quantity across a cart's lines
+    quantities = {}
+    for item in items:
+        key = (item['event'], item['tier'])
+        quantities[key] = quantities.get(key, 0) + int(item['quantity'])
+    return quantities
+
+def reserve_stock(items, force=False):
+    """Atomically decrement availability for every line of a cart.
+
+    All lines are applied by a single UPDATE inside one DB transaction, and
+    only for rows that still have enough stock. If any line cannot be
+    satisfied the whole cart is rolled back and InsufficientStockError is
+    raised. With force=True the availability check is skipped and stock is
+    clamped at zero instead (used for sales already completed offline).
+    """
+    # Merge duplicate lines so each ticket appears once in the statement
+    quantities = _cart_quantities(items)
+    if not quantities:
+        return
+
+    params = []
+    for (event, tier), qty in quantities.items():
+        params.extend([event, tier, qty])
+    query = _reserve_stock_query(len(quantities), force)
+
+    connection = None
+    try:
+        connection = get_db_connection()
+        with transaction(connection):
+            # The statement text only varies with the number of lines, so
+            # it stays prepared across checkouts
+            cursor = run_prepared(connection, query, params)
+            if not force and cursor.rowcount != len(quantities):
+                raise InsufficientStockError("Not enough stock left for one or more items in this transaction.")
+        if not force:
+            # Show the new stock levels right away, without a catalog reload
+            _apply_reservation(quantities)
+    finally:
+        if connection:
+            close_db_connection(connection)
+        invalidate_cache()  # Availability changed (or may have been re-read)
+
+def release_stock(items):
+    """Give back stock taken by reserve_stock() for a sale that was never recorded."""
+    for (event, tier), qty in _cart_quantities(items).items():
+        ticket_id = get_ticket_id(event, tier)
+        if ticket_id is None:
+            print(f"Warning: Cannot release {qty} x {event} - {tier}; ticket no longer exists")
+            continue
+        adjust_stock(ticket_id, qty)
 
 def get_next_ticket_id():
     """Get the next available ticket ID in EVT-XXX format."""
@@ -18,15 +18,24 @@ from kivy.uix.textinput import TextInput # Import TextInput
 from kivy.uix.widget import Widget # Import Widget
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.image import Image
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recyclegridlayout import RecycleGridLayout
 import xml.etree.ElementTree as ET # Import ElementTree for XML
 import os # For path operations
 import traceback # For detailed error logging
+import threading
 from datetime import date, datetime # Import date and datetime from datetime module
 # from kivy.uix.spinner import Spinner # No longer needed
 from adminNav import NavBar
 from userNav import UserNavBar
-from tickets import get_routes, get_ticket, update_ticket_availability
+from tickets import get_routes, get_ticket, reserve_stock, release_stock, InsufficientStockError, get_facets, get_catalog_generation, filter_tickets, invalidate_cache
 import auth
+import journal
+import events
+import startup
+import summary_index
+import sync_queue
 import re
 from decimal import Decimal
 
@@ -368,61 +377,76 @@ class CheckoutPopup(Popup):
 
     def confirm_purchase(self, instance):
         print("Confirm Purchase button pressed.")
-        current_transaction_id = self.transaction_panel.transaction_id_text
+        if instance.disabled:
+            return
+        # Block double submits while the stock reservation is in flight
+        instance.disabled = True
+        instance.text = 'Reserving stock...'
+
+        record = self.build_transaction_record()
+        if sync_queue.database_down() or startup.get_state()[0] == startup.FAILED:
+            # Known to be unreachable: complete the sale offline now rather
+            # than wait through connect timeouts; the sync worker applies the
+            # stock change once the sale reaches the database
+            print("Database unavailable, completing sale offline")
+            record['stock_reserved'] = False
+            self.complete_purchase(record)
+            return
+        print(f"Reserving stock for Transaction ID: {record['transaction_id']}")
+        threading.Thread(target=self._reserve_stock, args=(record, instance), daemon=True).start()
+
+    def _reserve_stock(self, record, confirm_button):
+        """Runs on a worker thread: reserve the whole cart in one DB round trip."""
+        error = None
+        try:
+            reserve_stock(record['items'])
+            record['stock_reserved'] = True
+        except InsufficientStockError as e:
+            error = e
+        except Exception as e:
+            # Database unreachable: complete the sale offline; the sync worker
+            # applies the stock change once the sale reaches the database
+            print(f"Warning: Could not reserve stock, deferring to sync: {e}")
+            sync_queue.report_database_error(e)
+            record['stock_reserved'] = False
+        Clock.schedule_once(lambda dt: self._on_stock_reserved(record, confirm_button, error))
+
+    def _on_stock_reserved(self, record, confirm_button, error):
+        if error is not None:
+            confirm_button.disabled = False
+            confirm_button.text = 'Confirm Purchase'
+            display_error_popup("Insufficient Stock", f"{error}\nPlease adjust the quantities and try again.")
+            self.dismiss()
+            self._refresh_route_selector()
+            return
+        self.complete_purchase(record)
+
+    def complete_purchase(self, record):
+        current_transaction_id = record['transaction_id']
         print(f"Attempting to confirm and save purchase for Transaction ID: {current_transaction_id}")
 
         # Save transaction to XML and get status
         print(f"Saving transaction data for {current_transaction_id} to XML...")
-        save_success, save_message_or_filename = self.save_transaction_to_xml()
+        save_success, save_message_or_filename = self.save_transaction_to_xml(record)
 
         if save_success:
             print(f"Successfully saved XML for {current_transaction_id} to {save_message_or_filename}")
+            events.publish(events.SALE_COMPLETED, record=record)
 
-            # Save transaction to database
-            print(f"Saving transaction data for {current_transaction_id} to database...")
-            db_save_success, db_save_message = self.save_transaction_to_db()
-            
-            if not db_save_success:
-                print(f"Warning: Failed to save transaction to database: {db_save_message}")
-                # Continue with the transaction even if DB save fails
-                # We still have the XML backup
-
-            # ---- DECREMENT STOCK ----
+            # Queue the sale for the background sync worker; the database save
+            # happens off the UI thread
             try:
-                all_current_tickets = get_routes() # Get fresh list of all tickets
-                items_purchased_details = self.transaction_panel.transaction_items
-
-                for purchased_item_info in items_purchased_details:
-                    event_name = purchased_item_info['event']
-                    tier_name = purchased_item_info['tier']
-                    quantity_bought = purchased_item_info['quantity']
-
-                    # Find the ticket in all_current_tickets and its index
-                    ticket_index_to_update = -1
-                    ticket_data_to_update = None
-
-                    for i, ticket_in_stock in enumerate(all_current_tickets):
-                        # Assuming event and tier uniquely identify a ticket type
-                        if ticket_in_stock['event'] == event_name and \
-                           ticket_in_stock['tier'] == tier_name:
-                            ticket_index_to_update = i
-                            ticket_data_to_update = ticket_in_stock.copy() # Work on a copy
-                            break
-                    
-                    if ticket_data_to_update and ticket_index_to_update != -1:
-                        new_availability = ticket_data_to_update.get('availability', 0) - quantity_bought
-                        ticket_data_to_update['availability'] = max(0, new_availability) # Ensure not negative
-                        
-                        update_ticket_availability(ticket_index_to_update, ticket_data_to_update)
-                        print(f"Stock updated for {event_name} ({tier_name}): new availability {ticket_data_to_update['availability']}")
-                    else:
-                        print(f"WARNING: Could not find ticket {event_name} ({tier_name}) in stock to update availability.")
+                sync_queue.enqueue(record)
+                print(f"Queued transaction {current_transaction_id} for database sync")
             except Exception as e:
-                print(f"ERROR updating stock availability: {e}")
-                traceback.print_exc() # For more details
-            # ---- END DECREMENT STOCK ----
+                print(f"Warning: Failed to queue transaction for database sync: {e}")
+                traceback.print_exc()
+                # Continue with the transaction; we still have the XML backup
         else:
             print(f"ERROR: Failed to save XML for {current_transaction_id}. Reason: {save_message_or_filename}")
+            if record.get('stock_reserved'):
+                # The sale is recorded nowhere, so put its reserved tickets back
+                threading.Thread(target=self._release_stock, args=(record,), daemon=True).start()
             # Show an error popup to the user
             error_label = Label(text=f"XML Save Failed:\n{save_message_or_filename}",
                                 color=(1, 0, 0, 1),  # Bright red text
@@ -449,6 +473,20 @@ class CheckoutPopup(Popup):
         self.transaction_panel.cancel_transaction(None) # Use the existing cancel logic to clear
 
         # Refresh the RouteSelector display in MainScreen
+        self._refresh_route_selector()
+        self.dismiss() # Close the popup
+
+    def _release_stock(self, record):
+        """Runs on a worker thread: undo the stock reservation of a failed sale."""
+        try:
+            release_stock(record['items'])
+            print(f"Released reserved stock for Transaction ID: {record['transaction_id']}")
+        except Exception as e:
+            print(f"ERROR: Could not release reserved stock for {record['transaction_id']}: {e}")
+            traceback.print_exc()
+        Clock.schedule_once(lambda dt: self._refresh_route_selector())
+
+    def _refresh_route_selector(self):
         try:
             # self.transaction_panel.parent is content_layout
             # self.transaction_panel.parent.parent is MainScreen instance
@@ -456,9 +494,9 @@ class CheckoutPopup(Popup):
             main_screen_instance = self.transaction_panel.parent.parent.parent
 
             if hasattr(main_screen_instance, 'route_selector') and \
-               hasattr(main_screen_instance.route_selector, 'filter_routes'):
+               hasattr(main_screen_instance.route_selector, 'refresh_catalog'):
                 print("Refreshing RouteSelector after purchase...")
-                main_screen_instance.route_selector.filter_routes()
+                main_screen_instance.route_selector.refresh_catalog()
             else:
                 print(f"WARNING: Could not find route_selector on MainScreen instance ({main_screen_instance}) to refresh.")
                 # Fallback attempt if direct parent traversal fails or structure changes
@@ -467,9 +505,9 @@ class CheckoutPopup(Popup):
                     current_screen_widget = app.root.current_screen
                     if isinstance(current_screen_widget, MainScreen): # Ensure it's the MainScreen
                         if hasattr(current_screen_widget, 'route_selector') and \
-                           hasattr(current_screen_widget.route_selector, 'filter_routes'):
+                           hasattr(current_screen_widget.route_selector, 'refresh_catalog'):
                             print("Refreshing RouteSelector via App.get_running_app()...")
-                            current_screen_widget.route_selector.filter_routes()
+                            current_screen_widget.route_selector.refresh_catalog()
                         else:
                             print("Found MainScreen via App, but its route_selector is missing or filter_routes method.")
                     else:
@@ -477,13 +515,41 @@ class CheckoutPopup(Popup):
         except Exception as e:
             print(f"Error refreshing RouteSelector: {e}")
             traceback.print_exc()
-        self.dismiss() # Close the popup
 
-    def save_transaction_to_xml(self):
-        """Saves the current transaction details to an XML file."""
+    def build_transaction_record(self):
+        """Snapshot the current transaction as a plain dict for saving and syncing."""
+        tp = self.transaction_panel
+        cash_tendered = float(tp.cash_tendered)
+        return {
+            'transaction_id': tp.transaction_id_text,
+            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'username': auth.session["username"],
+            'user_id': auth.session.get("user_id"),
+            'items': [
+                {
+                    'ticket_id': item.get('ticket_id'),
+                    'event': item['event'],
+                    'tier': item['tier'],
+                    'quantity': item['quantity'],
+                    'price': float(item['price'])
+                }
+                for item in tp.transaction_items
+            ],
+            'subtotal': float(tp.subtotal),
+            'tax': float(tp.tax),
+            'discount_title': tp.selected_discount['title'],
+            'discount_factor': tp.selected_discount['factor'],
+            'discount_amount': float(tp.discount_amount),
+            'total': float(tp.total),
+            'payment_method': tp.selected_payment_method,
+            'cash_tendered': cash_tendered,
+            'change': cash_tendered - float(tp.total)
+        }
+
+    def save_transaction_to_xml(self, record):
+        """Saves the transaction details to the daily XML journal."""
         try:
-            tp = self.transaction_panel
-            if not tp.transaction_id_text:
+            if not record['transaction_id']:
                 return False, "Transaction ID is empty. Cannot save XML."
 
             # Create an Element for the current transaction
@@ -491,8 +557,8 @@ class CheckoutPopup(Popup):
             
             # Use a dictionary to store all elements for faster access
             elements = {
-                'TransactionID': tp.transaction_id_text,
-                'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                'TransactionID': record['transaction_id'],
+                'Timestamp': record['timestamp']
             }
             
             # Add basic transaction info
@@ -501,7 +567,7 @@ class CheckoutPopup(Popup):
 
             # Add items in a single loop
             items_xml = ET.SubElement(transaction_element, "Items")
-            for item in tp.transaction_items:
+            for item in record['items']:
                 item_xml = ET.SubElement(items_xml, "Item")
                 item_data = {
                     'Event': item['event'],
@@ -516,13 +582,13 @@ class CheckoutPopup(Popup):
             # Add summary in a single block
             summary_xml = ET.SubElement(transaction_element, "Summary")
             summary_data = {
-                'Subtotal': f"{tp.subtotal:.2f}",
+                'Subtotal': f"{record['subtotal']:.2f}",
                 'TaxRate': f"{TAX_RATE*100:.0f}%",
-                'TaxAmount': f"{tp.tax:.2f}",
-                'DiscountTitle': tp.selected_discount['title'],
-                'DiscountFactor': str(tp.selected_discount['factor']),
-                'DiscountAmount': f"{tp.discount_amount:.2f}",
-                'Total': f"{tp.total:.2f}"
+                'TaxAmount': f"{record['tax']:.2f}",
+                'DiscountTitle': record['discount_title'],
+                'DiscountFactor': str(record['discount_factor']),
+                'DiscountAmount': f"{record['discount_amount']:.2f}",
+                'Total': f"{record['total']:.2f}"
             }
             for key, value in summary_data.items():
                 ET.SubElement(summary_xml, key).text = str(value)
@@ -530,151 +596,117 @@ class CheckoutPopup(Popup):
             # Add payment info
             payment_xml = ET.SubElement(transaction_element, "Payment")
             payment_data = {
-                'PaymentMethod': tp.selected_payment_method,
-                'CashTendered': f"{float(tp.cash_tendered):.2f}",
-                'Change': f"{float(tp.cash_tendered) - tp.total:.2f}"
+                'PaymentMethod': record['payment_method'],
+                'CashTendered': f"{record['cash_tendered']:.2f}",
+                'Change': f"{record['change']:.2f}"
             }
             for key, value in payment_data.items():
                 ET.SubElement(payment_xml, key).text = str(value)
 
-            # --- Logic for daily XML file ---
-            today_str = date.today().strftime("%Y-%m-%d")
-            transactions_dir = "transactions"
-            if not os.path.exists(transactions_dir):
-                os.makedirs(transactions_dir)
-            daily_filename = os.path.join(transactions_dir, f"transactions_{today_str}.xml")
+            # Append to today's journal (compacted into the daily XML file later)
+            # and fold the sale into today's summary sidecar
+            journal_filename = summary_index.record_transaction(transaction_element)
 
-            # Create or load the daily transactions file
-            try:
-                if os.path.exists(daily_filename):
-                    tree = ET.parse(daily_filename)
-                    daily_root = tree.getroot()
-                    if daily_root.tag != "DailyTransactions":
-                        daily_root = ET.Element("DailyTransactions")
-                        tree = ET.ElementTree(daily_root)
-                else:
-                    daily_root = ET.Element("DailyTransactions")
-                    tree = ET.ElementTree(daily_root)
-            except ET.ParseError:
-                daily_root = ET.Element("DailyTransactions")
-                tree = ET.ElementTree(daily_root)
-
-            # Add the transaction and save
-            daily_root.append(transaction_element)
-            ET.indent(tree, space="\t", level=0)
-            tree.write(daily_filename, encoding="utf-8", xml_declaration=True)
-
-            return True, daily_filename
+            return True, journal_filename
 
         except Exception as e:
             error_details = traceback.format_exc()
             print(f"[XML SAVE] CRITICAL ERROR saving transaction to XML: {e}\n{error_details}")
             return False, f"XML generation/write error: {str(e)}\nSee console for details."
 
-    def save_transaction_to_db(self):
-        """Saves the current transaction details to the database."""
-        connection = None
-        cursor = None
-        try:
-            tp = self.transaction_panel
-            if not tp.transaction_id_text:
-                print("[DB SAVE] Transaction ID is empty")
-                return False, "Transaction ID is empty. Cannot save to database."
-
-            print(f"[DB SAVE] Starting transaction save for ID: {tp.transaction_id_text}")
-
-            # Get the current user's ID from the session
-            from auth import session
-            user_id = None
-            if session["username"]:
-                from db_config import execute_query
-                query = "SELECT id FROM users WHERE username = %s"
-                result = execute_query(query, (session["username"],), fetch=True)
-                if result:
-                    user_id = result[0]['id']
-                    print(f"[DB SAVE] Found user ID: {user_id}")
-                else:
-                    print("[DB SAVE] No user ID found for username:", session["username"])
-
-            # Get all ticket IDs in one query to avoid multiple database calls
-            ticket_ids = {}
-            ticket_query = "SELECT ticket_id, event, tier FROM tickets"
-            ticket_results = execute_query(ticket_query, fetch=True)
-            for ticket in ticket_results:
-                key = (ticket['event'], ticket['tier'])
-                ticket_ids[key] = ticket['ticket_id']
-            print(f"[DB SAVE] Found {len(ticket_ids)} tickets in database")
-
-            # Prepare all transaction items for batch insert
-            item_values = []
-            for item in tp.transaction_items:
-                key = (item['event'], item['tier'])
-                if key not in ticket_ids:
-                    print(f"[DB SAVE] Ticket not found: {item['event']} - {item['tier']}")
-                    return False, f"Ticket not found in database: {item['event']} - {item['tier']}"
-                
-                ticket_id = ticket_ids[key]
-                item_values.append((
-                    ticket_id,
-                    item['quantity'],
-                    float(item['price'])
-                ))
-            print(f"[DB SAVE] Prepared {len(item_values)} items for insertion")
-
-            # Get a connection and start a transaction
-            from db_config import get_db_connection
-            connection = get_db_connection()
-            cursor = connection.cursor(dictionary=True)
-            print("[DB SAVE] Got database connection")
-            
-            # Insert transaction
-            transaction_query = """
-                INSERT INTO transactions 
-                (transaction_id, user_id, total_amount, tax_amount, discount_amount, created_at)
-                VALUES (%s, %s, %s, %s, %s, NOW())
-            """
-            transaction_params = (
-                tp.transaction_id_text,
-                user_id,
-                float(tp.total),
-                float(tp.tax),
-                float(tp.discount_amount)
-            )
-            
-            cursor.execute(transaction_query, transaction_params)
-            transaction_db_id = cursor.lastrowid
-            print(f"[DB SAVE] Inserted transaction with ID: {transaction_db_id}")
-
-            # Insert transaction items
-            if item_values:
-                item_query = """
-                    INSERT INTO transaction_items 
-                    (transaction_id, ticket_id, quantity, price_at_sale, created_at)
-                    VALUES (%s, %s, %s, %s, NOW())
-                """
-                for item in item_values:
-                    cursor.execute(item_query, (transaction_db_id,) + item)
-                print(f"[DB SAVE] Inserted {len(item_values)} transaction items")
-
-            # Commit the transaction
-            connection.commit()
-            print("[DB SAVE] Transaction committed successfully")
-            return True, "Transaction saved to database successfully"
+class RouteCard(RecycleDataViewBehavior, BoxLayout):
+    """Event card shown in the RouteSelector grid.
+
+    Cards are recycled by the RecycleView: only the visible ones exist, and
+    scrolling or filtering just rebinds them to a different ticket dict.
+    """
+    ticket_id = StringProperty('')
+    event = StringProperty('')
+    tier = StringProperty('')
+    price = ObjectProperty(0)
+    stock = NumericProperty(0)
+
+    def __init__(self, **kwargs):
+        super(RouteCard, self).__init__(**kwargs)
+        self.orientation = 'vertical'
+        self.padding = dp(10)
+        self.route_selector = None
+        self.original_border_color = (0.4, 0.4, 0.4, 1)
+
+        with self.canvas.before:
+            # Always use white background
+            Color(*white)
+            self.bg_rect = RoundedRectangle(size=self.size, pos=self.pos, radius=[dp(8)])
+            # Border with tier color; animate_card_pulse targets this group
+            self.border_color = Color(*self.original_border_color, group='color_border')
+            self.border_instruction = RoundedRectangle(size=self.size, pos=self.pos, radius=[dp(8)])
+        self.bind(size=self._update_card_rect, pos=self._update_card_rect)
+
+        # Always show artist, tier, and price on their own lines
+        self.event_label = Label(font_size=sp(16), bold=True, color=black, size_hint=(1, None),
+                                 height=dp(28), halign='left', valign='middle')
+        self.tier_label = Label(font_size=sp(13), color=black, size_hint=(1, None),
+                                height=dp(20), halign='left', valign='middle')
+        self.price_label = Label(font_size=sp(18), bold=True, color=black, size_hint=(1, None),
+                                 height=dp(25), halign='left', valign='middle')
+        # Stock indicator or OUT OF STOCK, empty when stock is healthy
+        self.status_label = Label(font_size=sp(12), bold=True, color=(1, 0, 0, 1), size_hint=(1, None),
+                                  height=dp(20), halign='left', valign='middle')
+        for label in (self.event_label, self.tier_label, self.price_label, self.status_label):
+            label.bind(size=self._update_label)
+            self.add_widget(label)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.route_selector = getattr(rv, 'route_selector', None)
+        super(RouteCard, self).refresh_view_attrs(rv, index, data)
+
+        is_available_for_purchase = self.stock > 0
+        tier = self.tier
+        self.original_border_color = (0.85, 0.7, 0.1, 1) if tier == "Gold Seating" else ((0.75, 0.75, 0.75, 1) if tier == "Silver Seating" else (0.4, 0.4, 0.4, 1))
+        # A recycled card may still be mid-pulse for its previous ticket
+        Animation.cancel_all(self.border_color)
+        self.border_color.rgba = self.original_border_color
+
+        self.event_label.text = self.event
+        self.tier_label.text = tier
+        self.price_label.text = f"₱{self.price:,}"
+        self.price_label.color = black if is_available_for_purchase else (0.6, 0.6, 0.6, 1)
+
+        if not is_available_for_purchase:
+            self.opacity = 0.7
+            self.status_label.text = "OUT OF STOCK"
+            self.status_label.font_size = sp(14)
+            self.status_label.color = (0.8, 0, 0, 1)
+            self.status_label.halign = 'center'
+        else:
+            self.opacity = 1
+            if self.stock <= 5:
+                self.status_label.text = "CRITICALLY LOW STOCK"
+            elif self.stock <= 10:
+                self.status_label.text = "LOW STOCK"
+            else:
+                self.status_label.text = ""
+            self.status_label.font_size = sp(12)
+            self.status_label.color = (1, 0, 0, 1) # Red color for low stock
+            self.status_label.halign = 'left'
+
+    def on_touch_down(self, touch):
+        # Only cards with stock left are selectable
+        if self.stock > 0 and self.route_selector and self.collide_point(*touch.pos):
+            item_data = {"ticket_id": self.ticket_id, "event": self.event, "tier": self.tier,
+                         "price": self.price, "stock": self.stock}
+            return self.route_selector.select_card(self, touch, item_data)
+        return super(RouteCard, self).on_touch_down(touch)
+
+    def _update_card_rect(self, instance, value):
+        self.bg_rect.size = self.size
+        self.bg_rect.pos = self.pos
+        self.border_instruction.size = self.size
+        self.border_instruction.pos = self.pos
+
+    def _update_label(self, instance, value):
+        instance.text_size = (instance.width, None)
 
-        except Exception as e:
-            if connection:
-                connection.rollback()
-                print("[DB SAVE] Transaction rolled back due to error")
-            error_details = traceback.format_exc()
-            print(f"[DB SAVE] CRITICAL ERROR saving transaction to database: {e}\n{error_details}")
-            return False, f"Database error: {str(e)}\nSee console for details."
-        finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                from db_config import close_db_connection
-                close_db_connection(connection)
-                print("[DB SAVE] Database connection closed")
 
 class RouteSelector(BoxLayout):
     def __init__(self, transaction_panel, **kwargs):
@@ -699,34 +731,85 @@ class RouteSelector(BoxLayout):
         self.filter_layout = None
         self.selected_tier = 'All Tiers'
         self.selected_artist = 'All Artists'
+        self._facets = None  # (tiers, artists) the current tabs were built from
+        self._loaded_key = None  # (catalog generation, tier, artist) shown in the grid
+        self._refreshing = False  # A catalog check is running on a worker thread
+        self._refresh_pending = False  # Another check was asked for meanwhile
 
         # Build filter tabs and add as first widget
         self.build_filter_tabs()
 
-        # Add route cards in a scrollview (always after filter bars)
-        self.route_container = GridLayout(cols=2, spacing=dp(15), size_hint_y=None)
+        # Route cards in a RecycleView (always after filter bars); only the
+        # visible cards are instantiated and filtering just swaps the data
+        self.route_container = RecycleGridLayout(
+            cols=2, spacing=dp(15), size_hint_y=None,
+            default_size=(None, dp(140)), default_size_hint=(1, None)
+        )
         self.route_container.bind(minimum_height=self.route_container.setter('height'))
 
-        self.scrollview = ScrollView(size_hint=(1, 1))
+        self.scrollview = RecycleView(size_hint=(1, 1))
+        self.scrollview.viewclass = RouteCard
+        self.scrollview.route_selector = self
         self.scrollview.add_widget(self.route_container)
         self.add_widget(self.scrollview)
 
-        # Load routes
+        # Show whatever is cached, then load the catalog off the UI thread
+        self.refresh_catalog()
+
+    def refresh_catalog(self, *args):
+        """Show the cached catalog now and recheck it against MySQL on a worker thread.
+
+        The UI thread never waits on the database here, so a checkout or a
+        sync stays instant even while MySQL is slow or unreachable.
+        """
         self.filter_routes()
+        if self._refreshing:
+            self._refresh_pending = True
+            return
+        self._refreshing = True
+        threading.Thread(target=self._refresh_catalog_worker, daemon=True).start()
+
+    def _refresh_catalog_worker(self):
+        try:
+            get_routes()
+        except Exception as e:
+            print(f"Warning: Could not refresh the ticket catalog: {e}")
+        Clock.schedule_once(self._on_catalog_refreshed)
+
+    def _on_catalog_refreshed(self, dt):
+        self._refreshing = False
+        self.build_filter_tabs()
+        self.filter_routes()
+        if self._refresh_pending:
+            self._refresh_pending = False
+            self.refresh_catalog()
+
+    def _on_refresh_pressed(self, instance):
+        invalidate_cache()  # Recheck the catalog even if it was checked just now
+        self.refresh_catalog()
 
     def build_filter_tabs(self):
+        # Unique tiers and artists are precomputed once per catalog refresh;
+        # only the cache is read here (see refresh_catalog)
+        facets = get_facets(refresh=False)
+        if facets == self._facets and self.filter_layout in self.children:
+            return  # Same tabs as last time; keep the existing widgets
+        self._facets = facets
+
+        # Drop filters whose tier or artist no longer exists
+        if self.selected_tier not in facets[0]:
+            self.selected_tier = 'All Tiers'
+        if self.selected_artist not in facets[1]:
+            self.selected_artist = 'All Artists'
+
         # Remove old filter layout if it exists
         if self.filter_layout and self.filter_layout in self.children:
             self.remove_widget(self.filter_layout)
         self.tier_filter_buttons = []
         self.artist_filter_buttons = []
 
-        # Get unique tiers and artists from current routes
-        routes = get_routes()
-        tiers = sorted(set(route['tier'] for route in routes))
-        artists = sorted(set(route['event'] for route in routes))
-        tiers = ['All Tiers'] + tiers
-        artists = ['All Artists'] + artists
+        tiers = ['All Tiers'] + list(facets[0])
+        artists = ['All Artists'] + list(facets[1])
 
         # Create main filter layout with horizontal padding
         filter_layout = BoxLayout(orientation='vertical', size_hint=(1, None), height=dp(120), spacing=dp(5), padding=[dp(10), 0, dp(10), 0])
@@ -825,7 +908,7 @@ class RouteSelector(BoxLayout):
             background_normal='',
             border=(16, 16, 16, 16)
         )
-        refresh_btn.bind(on_release=lambda instance: self.load_routes(get_routes()))
+        refresh_btn.bind(on_release=self._on_refresh_pressed)
         refresh_layout.add_widget(refresh_btn)
 
         # Add all layouts to the main filter layout
@@ -874,163 +957,29 @@ class RouteSelector(BoxLayout):
         self.filter_routes()
 
     def filter_routes(self):
-        routes = get_routes()
-        filtered = []
-        for route in routes:
-            if (self.selected_tier == 'All Tiers' or route['tier'] == self.selected_tier) and \
-               (self.selected_artist == 'All Artists' or route['event'] == self.selected_artist):
-                filtered.append(route)
-        self.load_routes(filtered)
+        key = (get_catalog_generation(refresh=False), self.selected_tier, self.selected_artist)
+        if key == self._loaded_key:
+            return  # Same catalog and filters as what is already shown
+        tier = None if self.selected_tier == 'All Tiers' else self.selected_tier
+        artist = None if self.selected_artist == 'All Artists' else self.selected_artist
+        self.load_routes(filter_tickets(tier=tier, event=artist, refresh=False))
+        self._loaded_key = key
 
     def load_routes(self, routes):
-        self.route_container.clear_widgets()
-        for ticket in routes:
-            card = self.create_route_card(
-                ticket["event"],
-                ticket["tier"],
-                ticket["price"],
-                ticket["availability"]  # Assuming this is the stock quantity
-            )
-            self.route_container.add_widget(card)
-
-    def create_route_card(self, event, tier, price, stock_quantity):
-        card = BoxLayout(
-            orientation='vertical',
-            size_hint=(1, None),
-            height=dp(140),
-            padding=dp(10)
-        )
-
-        is_available_for_purchase = stock_quantity > 0
-
-        # Create border based on tier and store original color
-        border_color = (0.85, 0.7, 0.1, 1) if tier == "Gold Seating" else ((0.75, 0.75, 0.75, 1) if tier == "Silver Seating" else (0.4, 0.4, 0.4, 1))
-        card.original_border_color = border_color # Store original color
-
-        with card.canvas.before:
-            # Always use white background
-            Color(*white)
-            self.card_rect = RoundedRectangle(size=card.size, pos=card.pos, radius=[dp(8)])
-
-            # Add border with tier color
-            Color(*border_color, group='color_border')
-            card.border_instruction = RoundedRectangle(
-                size=card.size, pos=card.pos, radius=[dp(8)],
-                line_width=dp(1.5) if is_available_for_purchase else dp(0),
-                width=dp(1.5) if is_available_for_purchase else dp(0)
-            )
-
-        card.bind(size=lambda obj, val: self._update_card_rect(obj, val, obj.original_border_color, is_available_for_purchase),
-                  pos=lambda obj, val: self._update_card_rect(obj, val, obj.original_border_color, is_available_for_purchase))
-
-        # Always show artist, tier, and price on their own lines
-        event_label = Label(
-            text=f"{event}",
-            font_size=sp(16),
-            bold=True,
-            color=black,
-            size_hint=(1, None),
-            height=dp(28),
-            halign='left',
-            valign='middle'
-        )
-        event_label.bind(size=self._update_label)
-        tier_label = Label(
-            text=f"{tier}",
-            font_size=sp(13),
-            color=black,
-            size_hint=(1, None),
-            height=dp(20),
-            halign='left',
-            valign='middle'
-        )
-        tier_label.bind(size=self._update_label)
-        price_label = Label(
-            text=f"₱{price:,}",
-            font_size=sp(18),
-            bold=True,
-            color=black if is_available_for_purchase else (0.6, 0.6, 0.6, 1),
-            size_hint=(1, None),
-            height=dp(25),
-            halign='left',
-            valign='middle'
-        )
-        price_label.bind(size=self._update_label)
-        card.add_widget(event_label)
-        card.add_widget(tier_label)
-        card.add_widget(price_label)
-
-        # For unavailable card, show "OUT OF STOCK"
-        # Add stock level indicators (Low Stock, Critically Low Stock) if applicable
-        stock_indicator_label = None
-        if 1 <= stock_quantity <= 5:
-            stock_indicator_label = Label(
-                text="CRITICALLY LOW STOCK",
-                font_size=sp(12),
-                bold=True,
-                color=(1, 0, 0, 1), # Red color for critically low
-                size_hint=(1, None),
-                height=dp(20),
-                halign='left',
-                valign='middle'
-            )
-        elif 6 <= stock_quantity <= 10:
-            stock_indicator_label = Label(
-                text="LOW STOCK",
-                font_size=sp(12),
-                bold=True,
-                color=(1, 0, 0, 1), # Red color for low
-                size_hint=(1, None),
-                height=dp(20),
-                halign='left',
-                valign='middle'
-            )
-
-        if not is_available_for_purchase:
-            card.opacity = 0.7
-            out_label = Label(
-                text="OUT OF STOCK",
-                font_size=sp(14),
-                bold=True,
-                color=(0.8, 0, 0, 1),
-                size_hint=(1, None),
-                height=dp(20),
-                halign='center',
-                valign='middle'
-            )
-            card.add_widget(out_label)
-        else: # Item is available for purchase (stock > 0)
-            # Make card selectable
-            card.bind(on_touch_down=lambda obj, touch: self.select_card(obj, touch, {"event": event, "tier": tier, "price": price, "stock": stock_quantity}))
-            if stock_indicator_label: # If low or critically low stock, add the indicator
-                stock_indicator_label.bind(size=self._update_label)
-                card.add_widget(stock_indicator_label)
-
-        return card
-
-    def _update_label(self, instance, value):
-        instance.text_size = (instance.width, None)
-
-    def _update_card_rect(self, instance, value, border_color, is_available_for_purchase):
-        instance.canvas.before.clear()
-        with instance.canvas.before:
-            # Always use white background
-            Color(*white)
-            RoundedRectangle(size=instance.size, pos=instance.pos, radius=[dp(8)])
-
-            # Add border with tier color, only if available for purchase
-            Color(*border_color, group='color_border')
-            instance.border_instruction = RoundedRectangle(
-                size=instance.size, pos=instance.pos, radius=[dp(8)],
-                line_width=dp(1.5) if is_available_for_purchase else dp(0),
-                width=dp(1.5) if is_available_for_purchase else dp(0)
-            )
+        self._loaded_key = None  # Set again by filter_routes when it is the caller
+        # Swapping the data list rebinds the visible RouteCards in place
+        self.scrollview.data = [{
+            "ticket_id": ticket["ticket_id"],
+            "event": ticket["event"],
+            "tier": ticket["tier"],
+            "price": ticket["price"],
+            "stock": ticket["availability"]  # Assuming this is the stock quantity
+        } for ticket in routes]
 
     def select_card(self, instance, touch, item_data):
         if instance.collide_point(*touch.pos):
-            # Set this card as selected and refresh the route cards
+            # Remember the selected card; the pulse below is the only visual change
             self.selected_card_key = (item_data['event'], item_data['tier'])
-            self.filter_routes()  # This will redraw the cards with the new selection
             # Trigger the pulse animation
             self.animate_card_pulse(instance, instance.original_border_color)
             # Delay opening the quantity popup so the UI can update
@@ -1082,10 +1031,9 @@ class TransactionPanel(BoxLayout):
         self.padding = dp(15)
         # self.size_hint_x = 0.25 # Removed size_hint_x here, set in MainScreen
 
-        # --- Initialize transaction counter by finding the max ID from today's XML file ---
-        today_str = date.today().strftime("%Y-%m-%d")
-        transactions_dir = "transactions"
-        daily_root_tag = "DailyTransactions"
+        # --- Initialize transaction counter by finding the max ID from today's transactions ---
+        today_str = journal.today_str()
+        transactions_dir = journal.TRANSACTIONS_DIR
         max_existing_id = 0
 
         # Ensure the transactions directory exists
@@ -1097,29 +1045,25 @@ class TransactionPanel(BoxLayout):
                 print(f"[INIT] CRITICAL: Error creating directory {transactions_dir}: {e}. Transaction saving might fail.")
                 # Depending on desired behavior, you might want to raise an error or display a popup
 
-        daily_filename = os.path.join(transactions_dir, f"transactions_{today_str}.xml")
+        # Fold any journals left over from previous days into their XML files
+        journal.compact_stale_journals()
 
-        if os.path.exists(daily_filename):
+        if journal.day_exists(today_str):
             try:
-                tree = ET.parse(daily_filename)
-                daily_root = tree.getroot()
-                if daily_root.tag == daily_root_tag:
-                    for transaction_element in daily_root.findall("Transaction"):
-                        id_element = transaction_element.find("TransactionID")
-                        if id_element is not None and id_element.text:
-                            try:
-                                current_id = int(id_element.text)
-                                if current_id > max_existing_id:
-                                    max_existing_id = current_id
-                            except ValueError:
-                                print(f"[INIT] Warning: Non-integer TransactionID '{id_element.text}' found in {daily_filename}. Skipping.")
-                    print(f"[INIT] Max existing TransactionID for {today_str} is {max_existing_id} from {daily_filename}.")
-                else:
-                    print(f"[INIT] Warning: File {daily_filename} has unexpected root tag '{daily_root.tag}'. Max ID not determined from this file.")
-            except ET.ParseError:
-                print(f"[INIT] Warning: Could not parse {daily_filename}. Max ID not determined from this file.")
+                for transaction_element in journal.iter_transactions(today_str):
+                    id_element = transaction_element.find("TransactionID")
+                    if id_element is not None and id_element.text:
+                        try:
+                            current_id = int(id_element.text)
+                            if current_id > max_existing_id:
+                                max_existing_id = current_id
+                        except ValueError:
+                            print(f"[INIT] Warning: Non-integer TransactionID '{id_element.text}' found for {today_str}. Skipping.")
+                print(f"[INIT] Max existing TransactionID for {today_str} is {max_existing_id}.")
+            except (ET.ParseError, ValueError) as e:
+                print(f"[INIT] Warning: Could not read transactions for {today_str}: {e}. Max ID not determined.")
             except Exception as e:
-                print(f"[INIT] Error reading {daily_filename} to determine max transaction ID: {e}")
+                print(f"[INIT] Error reading transactions for {today_str} to determine max transaction ID: {e}")
         
         TransactionPanel._transaction_counter = max_existing_id # Initialize with the highest ID found
         # --- End of transaction counter initialization ---
@@ -1161,10 +1105,29 @@ class TransactionPanel(BoxLayout):
 
         self.add_widget(header_layout) # Add the new horizontal layout
 
+        # Live count of sales still waiting for the background database sync
+        self.sync_status_label = Label(
+            text="",
+            font_size=sp(12),
+            size_hint=(1, None),
+            height=dp(18),
+            halign='left',
+            color=(0.5, 0.5, 0.5, 1)
+        )
+        self.sync_status_label.bind(size=self._update_label)
+        self.add_widget(self.sync_status_label)
+        self.update_sync_status(sync_queue.pending_count(), 0)
+        # The queue calls back from its worker thread; hop onto the Kivy thread
+        sync_queue.add_listener(lambda pending, synced: Clock.schedule_once(lambda dt: self.update_sync_status(pending, synced)))
+
         # Generate the initial transaction ID
         self.generate_transaction_id()
 
 
+        # Line-item rows keyed by (event, tier), patched in place as the cart changes
+        self._line_items = {}  # (event, tier) -> item dict in transaction_items
+        self._line_widgets = {}  # (event, tier) -> row widget in items_container
+
         # Container for dynamically added items
         self.items_container = BoxLayout(orientation='vertical', size_hint=(1, None), spacing=dp(10))
         # Bind height to children's minimum_height to allow scrolling if needed
@@ -1421,6 +1384,20 @@ class TransactionPanel(BoxLayout):
         TransactionPanel._transaction_counter += 1
         self.transaction_id_text = f"{TransactionPanel._transaction_counter:05d}" # Format as 5 digits with leading zeros
 
+    # Method to update the unsynced sales indicator
+    def update_sync_status(self, pending, synced):
+        if pending:
+            self.sync_status_label.text = f"{pending} sale(s) waiting to sync"
+            self.sync_status_label.color = (0.95, 0.6, 0.1, 1)
+        else:
+            self.sync_status_label.text = "All sales synced"
+            self.sync_status_label.color = (0.5, 0.5, 0.5, 1)
+        # Synced sales have updated stock levels, so refresh the event cards
+        if synced:
+            main_screen_instance = self.parent.parent.parent if self.parent and self.parent.parent else None
+            if main_screen_instance is not None and hasattr(main_screen_instance, 'route_selector'):
+                main_screen_instance.route_selector.refresh_catalog()
+
     # Method to update the transaction ID label text
     def update_transaction_id_label(self, instance, value):
         self.transaction_id_label.text = f"#{value}" # Add '#' prefix
@@ -1432,111 +1409,113 @@ class TransactionPanel(BoxLayout):
             item_data['price'] = float(item_data['price'])
             
         # Check if the item is already in the list
-        found = False
-        for item in self.transaction_items:
-            if item['event'] == item_data['event'] and item['tier'] == item_data['tier']:
-                item['quantity'] += quantity # Add the specified quantity
-                found = True
-                break
-
-        if not found:
-            item_data['quantity'] = quantity # Set the initial quantity
-            # Append to a temporary list first to trigger ListProperty observer
-            temp_items = self.transaction_items[:]
-            temp_items.append(item_data)
-            self.transaction_items = temp_items
+        key = (item_data['event'], item_data['tier'])
+        item = self._line_items.get(key)
+        if item is not None:
+            item['quantity'] += quantity # Add the specified quantity
+            self._line_widgets[key].qty_label.text = f"x{item['quantity']}"
         else:
-             # If item was found and quantity updated, need to trigger update manually for ListProperty
-             self.transaction_items = self.transaction_items[:]
+            item_data['quantity'] = quantity # Set the initial quantity
+            self._line_items[key] = item_data
+            self.transaction_items.append(item_data)
+            self._add_item_widget(item_data)
 
-        self.update_items_display()
         self.calculate_totals() # Recalculate totals after adding/updating item
         self.update_total_display()
 
-    # Method to update the display of items in the transaction panel
+    # Method to rebuild the display of all items in the transaction panel
     def update_items_display(self):
         self.items_container.clear_widgets()
+        self._line_items = {}
+        self._line_widgets = {}
         for item in self.transaction_items:
-            item_widget = BoxLayout(orientation='vertical', size_hint=(1, None), height=dp(70))
+            self._line_items[(item['event'], item['tier'])] = item
+            self._add_item_widget(item)
 
-            item_header = BoxLayout(size_hint=(1, None), height=dp(25))
-            item_name = Label(
-                text=item['event'],
-                font_size=sp(14),
-                bold=True,
-                size_hint=(0.7, 1), # Adjusted size_hint to make space for the remove button
-                halign='left',
-                color=black
-            )
-            item_name.bind(size=self._update_label)
+    def _add_item_widget(self, item):
+        item_widget = BoxLayout(orientation='vertical', size_hint=(1, None), height=dp(70))
 
-            # BoxLayout for quantity and remove button
-            qty_remove_layout = BoxLayout(size_hint=(0.3, 1), spacing=dp(5))
+        item_header = BoxLayout(size_hint=(1, None), height=dp(25))
+        item_name = Label(
+            text=item['event'],
+            font_size=sp(14),
+            bold=True,
+            size_hint=(0.7, 1), # Adjusted size_hint to make space for the remove button
+            halign='left',
+            color=black
+        )
+        item_name.bind(size=self._update_label)
 
-            item_qty = Label(
-                text=f"x{item['quantity']}",
-                font_size=sp(14),
-                size_hint=(0.6, 1), # Adjusted size_hint for quantity
-                halign='right',
-                color=black
-            )
-            item_qty.bind(size=self._update_label)
+        # BoxLayout for quantity and remove button
+        qty_remove_layout = BoxLayout(size_hint=(0.3, 1), spacing=dp(5))
 
-            # Remove button
-            remove_button = Button(
-                text="X",
-                font_size=sp(14),
-                size_hint=(0.4, 1), # Adjusted size_hint for remove button
-                background_normal="",
-                background_color=(0.9, 0.2, 0.2, 1), # Red color for remove
-                color=white,
-                bold=True
-            )
-            # Bind the remove button to the void_item method
-            remove_button.bind(on_press=lambda instance, item_to_remove=item: self.void_item(item_to_remove))
+        item_qty = Label(
+            text=f"x{item['quantity']}",
+            font_size=sp(14),
+            size_hint=(0.6, 1), # Adjusted size_hint for quantity
+            halign='right',
+            color=black
+        )
+        item_qty.bind(size=self._update_label)
+        item_widget.qty_label = item_qty # Updated in place when the quantity changes
 
-            qty_remove_layout.add_widget(item_qty)
-            qty_remove_layout.add_widget(remove_button)
+        # Remove button
+        remove_button = Button(
+            text="X",
+            font_size=sp(14),
+            size_hint=(0.4, 1), # Adjusted size_hint for remove button
+            background_normal="",
+            background_color=(0.9, 0.2, 0.2, 1), # Red color for remove
+            color=white,
+            bold=True
+        )
+        # Bind the remove button to the void_item method
+        remove_button.bind(on_press=lambda instance, item_to_remove=item: self.void_item(item_to_remove))
 
-            item_header.add_widget(item_name)
-            item_header.add_widget(qty_remove_layout) # Add the new layout
+        qty_remove_layout.add_widget(item_qty)
+        qty_remove_layout.add_widget(remove_button)
 
+        item_header.add_widget(item_name)
+        item_header.add_widget(qty_remove_layout) # Add the new layout
 
-            item_details = Label(
-                text=f"{item['tier']}, One-way",
-                font_size=sp(12),
-                size_hint=(1, None),
-                height=dp(15),
-                halign='left',
-                color=(0.5, 0.5, 0.5, 1)
-            )
-            item_details.bind(size=self._update_label)
-
-            item_price_each = item['price'] # Assuming price in data is per item
-            item_price_label = Label(
-                text=f"₱{item_price_each:,.2f} each",
-                font_size=sp(12),
-                size_hint=(1, None),
-                height=dp(15),
-                halign='left',
-                color=(0.5, 0.5, 0.5, 1)
-            )
-            item_price_label.bind(size=self._update_label)
 
+        item_details = Label(
+            text=f"{item['tier']}, One-way",
+            font_size=sp(12),
+            size_hint=(1, None),
+            height=dp(15),
+            halign='left',
+            color=(0.5, 0.5, 0.5, 1)
+        )
+        item_details.bind(size=self._update_label)
+
+        item_price_each = item['price'] # Assuming price in data is per item
+        item_price_label = Label(
+            text=f"₱{item_price_each:,.2f} each",
+            font_size=sp(12),
+            size_hint=(1, None),
+            height=dp(15),
+            halign='left',
+            color=(0.5, 0.5, 0.5, 1)
+        )
+        item_price_label.bind(size=self._update_label)
 
-            item_widget.add_widget(item_header)
-            item_widget.add_widget(item_details)
-            item_widget.add_widget(item_price_label)
 
-            self.items_container.add_widget(item_widget)
+        item_widget.add_widget(item_header)
+        item_widget.add_widget(item_details)
+        item_widget.add_widget(item_price_label)
+
+        self.items_container.add_widget(item_widget)
+        self._line_widgets[(item['event'], item['tier'])] = item_widget
 
     # Method to void an item from the transaction (renamed from remove_item_from_transaction)
     def void_item(self, item_to_remove):
-        # Find and remove the item from the list
-        # Create a new list without the item to ensure ListProperty observer is triggered
-        self.transaction_items = [item for item in self.transaction_items if item != item_to_remove]
+        key = (item_to_remove['event'], item_to_remove['tier'])
+        if self._line_items.pop(key, None) is None:
+            return # Already voided
+        self.transaction_items.remove(item_to_remove)
+        self.items_container.remove_widget(self._line_widgets.pop(key))
 
-        self.update_items_display()
         self.calculate_totals() # Recalculate totals after voiding item
         self.update_total_display()
 
@@ -1725,8 +1704,8 @@ class MainScreen(Screen):
             print("Adding user navigation bar")  # Debug log
             self.root_layout.add_widget(UserNavBar(), index=len(self.root_layout.children))
 
-        # Refresh filter tabs to reflect latest inventory
-        self.route_selector.build_filter_tabs()
+        # Refresh filter tabs and cards to reflect latest inventory
+        self.route_selector.refresh_catalog()
         # Refresh event cards to reflect latest inventory and filters
         self.route_selector.filter_routes()
 
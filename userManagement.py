@@ -8,10 +8,12 @@ from kivy.uix.popup import Popup
 from kivy.uix.scrollview import ScrollView
 from kivy.uix.spinner import Spinner
 from kivy.metrics import dp
+from kivy.clock import Clock
 from kivy.graphics import Color, Rectangle, RoundedRectangle, Line
 from adminNav import NavBar
 from models import User, Admin
 import auth
+from db_config import execute_query
 from kivy.uix.image import Image
 from kivy.uix.behaviors import ButtonBehavior
 from kivy.uix.widget import Widget
@@ -22,10 +24,6 @@ ACCENT_BLUE = (0.22, 0.27, 0.74, 1)
 LIGHT_GRAY_BG = (0.95, 0.95, 0.95, 1)
 WHITE = (1, 1, 1, 1)
 
-def get_users():
-    """Returns a list of all users."""
-    return auth.get_users()
-
 def add_user(user_data):
     """Adds a new user. user_data should include 'username', 'password', 'role'."""
     # Create a new User or Admin object based on role
@@ -37,9 +35,6 @@ def add_user(user_data):
     
     # Save the user to the database
     new_user.save()
-    
-    # Update the in-memory list
-    auth._users_list = auth.get_users()  # Refresh the list from database
     print(f"User added: {new_user.username} ({new_user.role})")
 
 def update_user(user_id, update_data):
@@ -50,11 +45,9 @@ def update_user(user_id, update_data):
         if 'username' in update_data:
             user.username = update_data['username']
         if 'password' in update_data and update_data['password']:
-            user.password = update_data['password']
+            user.set_password(update_data['password'])
         # Save changes to database
         user.save()
-        # Refresh the in-memory list
-        auth._users_list = auth.get_users()
         print(f"User updated: {user.username} ({user.role})")
         return True
     return False
@@ -63,8 +56,6 @@ def remove_user(user_id):
     """Removes a user by username."""
     query = "DELETE FROM users WHERE username = %s"
     execute_query(query, (user_id,))
-    # Refresh the in-memory list
-    auth._users_list = auth.get_users()
     print(f"User removed: {user_id}")
 
 class UserEditPopup(Popup):
@@ -257,7 +248,9 @@ class UserManagementScreen(Screen):
             w = instance.width
             self._search_border_line.points = [x, y, x + w, y]
         self.search_input.bind(pos=update_search_border, size=update_search_border)
-        self.search_input.bind(text=lambda instance, value: self.refresh_user_table())
+        # Searching queries the database, so wait for a pause in typing
+        self._search_trigger = Clock.create_trigger(self._on_search_changed, 0.3)
+        self.search_input.bind(text=lambda instance, value: self._search_trigger())
         action_bar.add_widget(self.search_input)
 
         add_user_btn = Button(
@@ -301,6 +294,19 @@ class UserManagementScreen(Screen):
         self.user_table.bind(minimum_height=self.user_table.setter('height'))
         self.scroll_view.add_widget(self.user_table)
         table_card.add_widget(self.scroll_view)
+
+        # Pager; users are loaded one page at a time
+        self._page = 0
+        pager = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.prev_page_btn = Button(text='< Prev', size_hint_x=None, width=dp(90), background_normal='', background_color=ACCENT_BLUE, color=(1,1,1,1))
+        self.prev_page_btn.bind(on_release=lambda instance: self.change_page(-1))
+        self.page_label = Label(text='', color=(0,0,0,0.7))
+        self.next_page_btn = Button(text='Next >', size_hint_x=None, width=dp(90), background_normal='', background_color=ACCENT_BLUE, color=(1,1,1,1))
+        self.next_page_btn.bind(on_release=lambda instance: self.change_page(1))
+        pager.add_widget(self.prev_page_btn)
+        pager.add_widget(self.page_label)
+        pager.add_widget(self.next_page_btn)
+        table_card.add_widget(pager)
         content_area.add_widget(table_card)
 
         self.layout.add_widget(content_area)
@@ -317,16 +323,29 @@ class UserManagementScreen(Screen):
             Color(*instance.row_bg_color)
             Rectangle(pos=instance.pos, size=instance.size)
 
+    def _on_search_changed(self, dt):
+        self._page = 0
+        self.refresh_user_table()
+
+    def change_page(self, step):
+        self._page = max(0, self._page + step)
+        self.refresh_user_table()
+
     def refresh_user_table(self):
         self.user_table.clear_widgets()
         search_term = self.search_input.text.strip().lower()
-        users = get_users()
+        page_size = auth.USERS_PAGE_SIZE
+        users, total = auth.get_users_page(self._page * page_size, page_size, search_term)
+        page_count = max(1, -(-total // page_size))
+        if self._page >= page_count:
+            # The last page emptied (deletes or a narrower search)
+            self._page = page_count - 1
+            users, total = auth.get_users_page(self._page * page_size, page_size, search_term)
+        self.page_label.text = f"Page {self._page + 1} of {page_count} ({total} users)"
+        self.prev_page_btn.disabled = self._page == 0
+        self.next_page_btn.disabled = self._page >= page_count - 1
 
         for idx, user in enumerate(users):
-            if search_term and not (search_term in user.username.lower() or \
-                                   search_term in user.role.lower()):
-                continue
-
             # Row with alternating background (white and light blue)
             row_bg_color = (1, 1, 1, 1) if idx % 2 == 0 else (0.22, 0.27, 0.74, 0.08)
 